@@ -33,6 +33,22 @@ assert any(app in INSTALLED_APPS for app in ['posts.apps.PostsConfig', 'posts'])
     'Пожалуйста зарегистрируйте приложение в `settings.INSTALLED_APPS`'
 )
 
+from core.test_runner import temp_cache_dir
+
+# Кэш создаётся уже при сборе тестов, поэтому каталог подменяется
+# в pytest_configure, а не в фикстуре.
+_temp_cache = temp_cache_dir()
+
+
+def pytest_configure(config):
+    """Файловый кэш тестов во временном каталоге, а не в BASE_DIR."""
+    _temp_cache.__enter__()
+
+
+def pytest_unconfigure(config):
+    _temp_cache.__exit__(None, None, None)
+
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
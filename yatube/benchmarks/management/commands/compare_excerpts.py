@@ -0,0 +1,77 @@
+import json
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core.utils import percentile
+from posts.models import AuthorStats, Group, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает загрузку страницы ленты с полным текстом постов '
+        'и только с анонсами. Разница видна на длинных постах: '
+        'generate_dataset --text-words 5000.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--output', help='Куда сохранить JSON.')
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        results = {}
+        for name, posts in self.feeds():
+            results[f'full {name}'] = self.measure(posts)
+            results[f'excerpt {name}'] = self.measure(posts.feed())
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<24} median {result["median_ms"]:>9.2f} ms  '
+                f'p95 {result["p95_ms"]:>9.2f} ms  '
+                f'peak {result["peak_kb"]:>9.1f} KB'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+
+    def feeds(self) -> list:
+        """Запросы лент на самых тяжёлых объектах датасета."""
+        posts = Post.objects.select_related('author', 'group')
+        feeds = [('index', posts)]
+        group = Group.objects.annotate(
+            posts_total=Count('posts')
+        ).order_by('-posts_total').first()
+        if group is not None:
+            feeds.append(('group_posts', posts.filter(group=group)))
+        author = AuthorStats.objects.order_by('-posts_count').first()
+        if author is not None:
+            feeds.append(('profile', posts.filter(author_id=author.user_id)))
+        follower = AuthorStats.objects.order_by('-following_count').first()
+        if follower is not None:
+            feeds.append(('follow_index', posts.filter(
+                author__following__user_id=follower.user_id
+            )))
+        return feeds
+
+    def measure(self, posts) -> dict:
+        """Время и пик памяти на загрузку первой страницы ленты."""
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            list(posts[:settings.AMOUNT_POSTS])
+            timings.append((time.perf_counter() - start) * 1000)
+        tracemalloc.start()
+        try:
+            page = list(posts[:settings.AMOUNT_POSTS])
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            'median_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'peak_kb': round(peak / 1024, 1),
+            'posts': len(page),
+        }
@@ -0,0 +1,74 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from benchmarks.scenarios import SEARCH_TERMS
+from core.paginator import CursorPaginator
+from core.utils import percentile
+from posts.models import Post
+from posts.search import SearchPaginator, fts_enabled
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает первую страницу поиска по индексу FTS5 '
+        'с прежним поиском через icontains.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--terms', default=','.join(SEARCH_TERMS),
+            help='Запросы через запятую.',
+        )
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--output', help='Куда сохранить JSON.')
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            raise CommandError('Полнотекстовый индекс есть только на SQLite.')
+        self.repeat = options['repeat']
+        posts = Post.objects.select_related('author', 'group')
+        results = {}
+        for term in options['terms'].split(','):
+            results[f'fts {term}'] = self.measure(lambda: SearchPaginator(
+                posts, settings.AMOUNT_POSTS, query=term
+            ))
+            results[f'icontains {term}'] = self.measure(
+                lambda: CursorPaginator(
+                    posts.filter(text__icontains=term),
+                    settings.AMOUNT_POSTS,
+                )
+            )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<32} median {result["median_ms"]:>9.2f} ms  '
+                f'p95 {result["p95_ms"]:>9.2f} ms  '
+                f'{result["count"]:>8} found'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+
+    def measure(self, make_paginator) -> dict:
+        """Время первой страницы вместе с общим количеством результатов."""
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            paginator = make_paginator()
+            list(paginator.get_cursor_page())
+            count = paginator.count
+            timings.append((time.perf_counter() - start) * 1000)
+        with CaptureQueriesContext(connection) as queries:
+            paginator = make_paginator()
+            list(paginator.get_cursor_page())
+            paginator.count
+        return {
+            'median_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'queries': len(queries),
+            'count': count,
+        }
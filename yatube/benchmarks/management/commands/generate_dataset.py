@@ -0,0 +1,209 @@
+import itertools
+import random
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.utils import chunks
+from posts.models import Comment, Follow, Group, Post, User
+from posts.search import fts_enabled
+
+# bulk_create превращает генератор в список, поэтому объекты
+# передаются ему частями.
+CHUNK_SIZE: int = 10_000
+
+WORDS = (
+    'яндекс', 'практикум', 'пост', 'группа', 'подписка', 'лента', 'автор',
+    'django', 'python', 'кэш', 'индекс', 'запрос', 'страница', 'шаблон',
+)
+
+
+def power_law_weights(size: int, alpha: float) -> list:
+    """Накопленные веса распределения Ципфа для `size` элементов."""
+    return list(itertools.accumulate(
+        1 / rank ** alpha for rank in range(1, size + 1)
+    ))
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими пользователями, группами, '
+        'постами, комментариями и подписками для бенчмарков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя.',
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного распределения активности.',
+        )
+        parser.add_argument(
+            '--text-words', type=int, default=60,
+            help='Средняя длина поста в словах.',
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Размер пачки INSERT, по умолчанию максимум для СУБД.',
+        )
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--no-timelines', action='store_true',
+            help='Не раскладывать ленты подписок после генерации.',
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.period = timedelta(days=options['days']).total_seconds()
+        users = self.create_users(options['users'], options['prefix'])
+        groups = self.create_groups(options['groups'], options['prefix'])
+        # Активность и популярность авторов распределены по степенному
+        # закону: немногие пишут и читаются больше всех.
+        weights = power_law_weights(len(users), options['alpha'])
+        posts = self.create_posts(
+            options['posts'], users, groups, weights, options['text_words'],
+        )
+        self.create_comments(
+            options['comments'], users, posts, options['alpha']
+        )
+        self.create_follows(options['follows'], users, weights)
+        call_command('recount_stats', stdout=self.stdout)
+        call_command('render_texts', stdout=self.stdout)
+        if fts_enabled():
+            call_command('rebuild_search_index', stdout=self.stdout)
+        if not options['no_timelines']:
+            call_command('rebuild_timelines', stdout=self.stdout)
+        # bulk_create не отправляет сигналы, поэтому версии страниц
+        # в кэше не поднялись и старые копии выглядели бы свежими.
+        cache.clear()
+
+    def bulk_create(self, model, objects) -> None:
+        for chunk in chunks(objects, CHUNK_SIZE):
+            model.objects.bulk_create(
+                chunk, batch_size=self.batch_size, ignore_conflicts=True
+            )
+
+    def last_pk(self, model) -> int:
+        return model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+
+    def spread_pub_dates(self, model, since_pk: int) -> None:
+        """Разносит `pub_date` объектов новее `since_pk` по периоду.
+
+        bulk_create сам проставляет auto_now_add, поэтому даты
+        задаются уже после вставки.
+        """
+        objects = model.objects.order_by('pk').values_list('pk', flat=True)
+        while True:
+            pks = list(objects.filter(pk__gt=since_pk)[:CHUNK_SIZE])
+            if not pks:
+                return
+            model.objects.bulk_update(
+                [model(pk=pk, pub_date=self.random_date()) for pk in pks],
+                ('pub_date',),
+            )
+            since_pk = pks[-1]
+
+    def random_date(self):
+        return self.now - timedelta(
+            seconds=self.random.random() * self.period
+        )
+
+    def random_text(self, words: int) -> str:
+        size = max(1, int(self.random.expovariate(1 / words)))
+        return ' '.join(self.random.choices(WORDS, k=size))
+
+    def create_users(self, amount: int, prefix: str) -> list:
+        self.bulk_create(User, (
+            User(username=f'{prefix}_user_{i}', password='!')
+            for i in range(amount)
+        ))
+        self.stdout.write(f'Пользователей: {amount}')
+        return list(User.objects.filter(
+            username__startswith=f'{prefix}_user_'
+        ).values_list('pk', flat=True))
+
+    def create_groups(self, amount: int, prefix: str) -> list:
+        self.bulk_create(Group, (
+            Group(
+                title=f'Группа {i}',
+                slug=f'{prefix}-group-{i}',
+                description=self.random_text(20),
+            )
+            for i in range(amount)
+        ))
+        self.stdout.write(f'Групп: {amount}')
+        return list(Group.objects.filter(
+            slug__startswith=f'{prefix}-group-'
+        ).values_list('pk', flat=True))
+
+    def create_posts(self, amount, users, groups, weights, words) -> list:
+        authors = self.random.choices(users, cum_weights=weights, k=amount)
+        since_pk = self.last_pk(Post)
+        self.bulk_create(Post, (
+            Post(
+                text=self.random_text(words),
+                author_id=author_id,
+                group_id=(
+                    self.random.choice(groups)
+                    if groups and self.random.random() < 0.7 else None
+                ),
+            )
+            for author_id in authors
+        ))
+        self.spread_pub_dates(Post, since_pk)
+        self.stdout.write(f'Постов: {amount}')
+        return list(
+            Post.objects.order_by('-pk').values_list('pk', flat=True)[:amount]
+        )
+
+    def create_comments(self, amount, users, posts, alpha) -> None:
+        if not posts:
+            return
+        post_ids = self.random.choices(
+            posts, cum_weights=power_law_weights(len(posts), alpha), k=amount
+        )
+        since_pk = self.last_pk(Comment)
+        self.bulk_create(Comment, (
+            Comment(
+                post_id=post_id,
+                author_id=self.random.choice(users),
+                text=self.random_text(15),
+            )
+            for post_id in post_ids
+        ))
+        self.spread_pub_dates(Comment, since_pk)
+        self.stdout.write(f'Комментариев: {amount}')
+
+    def create_follows(self, average, users, weights) -> None:
+        self.bulk_create(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id in users
+            for author_id in self.followed_authors(
+                user_id, average, users, weights
+            )
+        ))
+        self.stdout.write(f'Подписок: {Follow.objects.count()}')
+
+    def followed_authors(self, user_id, average, users, weights) -> set:
+        size = min(
+            int(self.random.expovariate(1 / average)) if average else 0,
+            len(users) - 1,
+        )
+        authors = set(self.random.choices(users, cum_weights=weights, k=size))
+        authors.discard(user_id)
+        return authors
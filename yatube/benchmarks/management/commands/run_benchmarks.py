@@ -0,0 +1,142 @@
+import json
+import re
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from benchmarks.scenarios import feed_scenarios, search_scenarios
+from core.utils import percentile
+
+CURSOR_RE = re.compile(r'[?;]cursor=([\w-]+)')
+
+
+def with_param(url: str, name: str, value) -> str:
+    """Добавляет GET-параметр к адресу, который уже может их содержать."""
+    return f'{url}{"&" if "?" in url else "?"}{name}={value}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа лент и страницы поста на разной глубине '
+        'пагинации, сохраняет результат в JSON и сравнивает с базовым.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--depths', default='1,10,100',
+            help='Глубины страниц через запятую.',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.',
+        )
+        parser.add_argument('--output', help='Куда сохранить JSON.')
+        parser.add_argument('--baseline', help='JSON прошлого прогона.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимое замедление медианы, по умолчанию 20%%.',
+        )
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        self.cold = options['cold']
+        depths = [int(depth) for depth in options['depths'].split(',')]
+        results = {}
+        for scenario in self.get_scenarios():
+            client = Client()
+            if scenario.user is not None:
+                client.force_login(scenario.user)
+            if not scenario.paginated:
+                results[scenario.name] = self.measure(client, scenario.url)
+                continue
+            for depth in depths:
+                results[f'{scenario.name} page={depth}'] = self.measure(
+                    client, with_param(scenario.url, 'page', depth)
+                )
+                cursor_url = self.walk_cursor(client, scenario.url, depth)
+                if cursor_url is not None:
+                    results[f'{scenario.name} cursor={depth}'] = (
+                        self.measure(client, cursor_url)
+                    )
+        report = {
+            'created': timezone.now().isoformat(),
+            'repeat': self.repeat,
+            'cold': self.cold,
+            'results': results,
+        }
+        self.print_table(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['threshold'])
+
+    def get_scenarios(self) -> list:
+        """Точка расширения: список сценариев для замера."""
+        return feed_scenarios() + search_scenarios()
+
+    def measure(self, client, url: str) -> dict:
+        timings = []
+        for _ in range(self.repeat):
+            if self.cold:
+                cache.clear()
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{url}: статус {response.status_code}')
+        if self.cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        return {
+            'url': url,
+            'median_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'min_ms': round(min(timings), 3),
+            'queries': len(queries),
+            'bytes': len(response.content),
+        }
+
+    @staticmethod
+    def walk_cursor(client, url: str, depth: int):
+        """Переходит по ссылкам «Следующая» до нужной страницы."""
+        page_url = url
+        for _ in range(depth - 1):
+            content = client.get(page_url).content.decode()
+            cursors = CURSOR_RE.findall(content)
+            if not cursors:
+                return None
+            page_url = with_param(url, 'cursor', cursors[-1])
+        return page_url
+
+    def print_table(self, results: dict) -> None:
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<32} median {result["median_ms"]:>9.2f} ms  '
+                f'p95 {result["p95_ms"]:>9.2f} ms  '
+                f'{result["queries"]:>3} queries  {result["bytes"]} B'
+            )
+
+    def compare(self, results: dict, baseline_path: str, threshold: float):
+        with open(baseline_path, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            baseline_ms = max(baseline[name]['median_ms'], 1e-6)
+            ratio = result['median_ms'] / baseline_ms
+            if ratio > 1 + threshold:
+                regressions.append(f'{name}: {ratio:.2f}x')
+        if regressions:
+            raise CommandError(
+                'Замедление больше порога: ' + ', '.join(regressions)
+            )
+        self.stdout.write('Регрессий нет.')
@@ -0,0 +1,76 @@
+"""Сценарии бенчмарка: какие страницы и от чьего имени запрашивать."""
+from collections import namedtuple
+from urllib.parse import urlencode
+
+from django.db.models import Count
+from django.urls import reverse
+
+from posts.models import AuthorStats, Comment, Group, Post
+
+Scenario = namedtuple('Scenario', ('name', 'url', 'user', 'paginated'))
+
+SEARCH_TERMS = ('индекс', 'кэш запрос')
+
+
+def feed_scenarios() -> list:
+    """Ленты и страница поста на самых тяжёлых объектах датасета."""
+    scenarios = [Scenario('index', reverse('posts:posts'), None, True)]
+    group = Group.objects.annotate(
+        posts_total=Count('posts')
+    ).order_by('-posts_total').first()
+    if group is not None:
+        scenarios.append(Scenario(
+            'group_posts',
+            reverse('posts:group_list', kwargs={'slug': group.slug}),
+            None,
+            True,
+        ))
+    author = AuthorStats.objects.select_related('user').order_by(
+        '-posts_count'
+    ).first()
+    if author is not None:
+        scenarios.append(Scenario(
+            'profile',
+            reverse(
+                'posts:profile', kwargs={'username': author.user.username}
+            ),
+            None,
+            True,
+        ))
+    post = Comment.objects.values('post').annotate(
+        comments_total=Count('pk')
+    ).order_by('-comments_total').first()
+    post_id = post['post'] if post else (
+        Post.objects.values_list('pk', flat=True).first()
+    )
+    if post_id is not None:
+        scenarios.append(Scenario(
+            'post_detail',
+            reverse('posts:post_detail', kwargs={'post_id': post_id}),
+            None,
+            False,
+        ))
+    follower = AuthorStats.objects.select_related('user').order_by(
+        '-following_count'
+    ).first()
+    if follower is not None:
+        scenarios.append(Scenario(
+            'follow_index',
+            reverse('posts:follow_index'),
+            follower.user,
+            True,
+        ))
+    return scenarios
+
+
+def search_scenarios() -> list:
+    """Поиск по словам, которые пишет генератор датасета."""
+    return [
+        Scenario(
+            f'search {term}',
+            f'{reverse("posts:search")}?{urlencode({"q": term})}',
+            None,
+            True,
+        )
+        for term in SEARCH_TERMS
+    ]
@@ -0,0 +1,115 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts.models import AuthorStats, Comment, Follow, Post, User
+
+
+class BenchmarkCommandsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'generate_dataset',
+            users=20,
+            groups=3,
+            posts=60,
+            comments=40,
+            follows=3,
+            stdout=StringIO(),
+        )
+
+    def setUp(self):
+        self.output = tempfile.mkstemp(suffix='.json')[1]
+
+    def tearDown(self):
+        os.remove(self.output)
+
+    def test_generate_dataset(self):
+        """Генератор создаёт связанные данные и пересчитывает счётчики."""
+        self.assertEqual(
+            User.objects.filter(username__startswith='bench_user_').count(),
+            20
+        )
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertTrue(Follow.objects.exists())
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('posts_count', flat=True)),
+            60
+        )
+        for model in (Post, Comment):
+            with self.subTest(model=model.__name__):
+                self.assertGreater(len(set(
+                    model.objects.values_list('pub_date', flat=True)
+                )), 1)
+                self.assertTrue(
+                    model._meta.get_field('pub_date').auto_now_add
+                )
+
+    def test_run_benchmarks_writes_json(self):
+        """Прогон сохраняет замеры всех сценариев в JSON."""
+        call_command(
+            'run_benchmarks', depths='1,2', repeat=2,
+            output=self.output, stdout=StringIO(),
+        )
+        with open(self.output, encoding='utf-8') as output:
+            results = json.load(output)['results']
+        for name in ('index page=1', 'index cursor=2', 'group_posts page=2',
+                     'profile page=1', 'post_detail', 'follow_index page=1',
+                     'search индекс page=1'):
+            with self.subTest(name=name):
+                self.assertIn(name, results)
+                self.assertIn('median_ms', results[name])
+
+    def test_compare_search(self):
+        """Индекс находит всё, что icontains, и посты по комментариям."""
+        call_command(
+            'compare_search', terms='индекс', repeat=1,
+            output=self.output, stdout=StringIO(),
+        )
+        with open(self.output, encoding='utf-8') as output:
+            results = json.load(output)
+        self.assertGreater(results['icontains индекс']['count'], 0)
+        self.assertGreaterEqual(
+            results['fts индекс']['count'],
+            results['icontains индекс']['count'],
+        )
+
+    def test_compare_excerpts(self):
+        """Ленты загружаются в обоих вариантах с одинаковыми постами."""
+        call_command(
+            'compare_excerpts', repeat=1,
+            output=self.output, stdout=StringIO(),
+        )
+        with open(self.output, encoding='utf-8') as output:
+            results = json.load(output)
+        for feed in ('index', 'group_posts', 'profile', 'follow_index'):
+            with self.subTest(feed=feed):
+                self.assertEqual(
+                    results[f'excerpt {feed}']['posts'],
+                    results[f'full {feed}']['posts'],
+                )
+                self.assertIn('peak_kb', results[f'excerpt {feed}'])
+
+    def test_run_benchmarks_fails_on_regression(self):
+        """Замедление относительно базового прогона роняет команду."""
+        call_command(
+            'run_benchmarks', depths='1', repeat=1,
+            output=self.output, stdout=StringIO(),
+        )
+        with open(self.output, encoding='utf-8') as output:
+            report = json.load(output)
+        for result in report['results'].values():
+            result['median_ms'] = 1e-6
+        with open(self.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output)
+        with self.assertRaises(CommandError):
+            call_command(
+                'run_benchmarks', depths='1', repeat=1,
+                baseline=self.output, stdout=StringIO(),
+            )
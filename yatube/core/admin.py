@@ -0,0 +1,76 @@
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.forms.models import BaseModelFormSet
+
+from core.paginator import EstimatedCountPaginator
+
+
+class LoadedAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которое не запрашивает уже загруженный объект.
+
+    Стандартный виджет достаёт выбранный объект отдельным запросом,
+    и в `list_editable` это запрос на каждую строку.
+    """
+    loaded = None
+
+    def optgroups(self, name, value, attr=None):
+        selected_choices = {
+            str(v) for v in value
+            if str(v) not in self.choices.field.empty_values
+        }
+        loaded = {str(obj.pk): obj for obj in self.loaded or ()}
+        if self.loaded is None or not selected_choices <= set(loaded):
+            return super().optgroups(name, value, attr)
+        default = (None, [], 0)
+        if not self.is_required and not self.allow_multiple_selected:
+            default[1].append(self.create_option(name, '', '', False, 0))
+        for pk in selected_choices:
+            default[1].append(self.create_option(
+                name,
+                loaded[pk].pk,
+                self.choices.field.label_from_instance(loaded[pk]),
+                selected_choices,
+                len(default[1]),
+            ))
+        return [default]
+
+
+class LoadedRelationsFormSet(BaseModelFormSet):
+    """Передаёт виджетам связанные объекты из `list_select_related`."""
+
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        for name, field in form.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if not isinstance(widget, LoadedAutocompleteSelect):
+                continue
+            model_field = form.instance._meta.get_field(name)
+            if model_field.is_cached(form.instance):
+                related = getattr(form.instance, name)
+                widget.loaded = [related] if related is not None else []
+        return form
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """Общие настройки для списков на миллионы строк.
+
+    Общее количество строк берётся из статистики СУБД, второй
+    COUNT(*) для «показать все» не выполняется, а поля из
+    `autocomplete_fields` в `list_editable` не делают запросов.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs.setdefault('widget', LoadedAutocompleteSelect(
+                db_field.remote_field,
+                self.admin_site,
+                using=kwargs.get('using'),
+            ))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_formset(self, request, **kwargs):
+        kwargs.setdefault('formset', LoadedRelationsFormSet)
+        return super().get_changelist_formset(request, **kwargs)
@@ -0,0 +1,94 @@
+"""Версионированный кэш с защитой от одновременной перегенерации."""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = 'cache_version:{}'
+LOCK_KEY = 'cache_lock:{}'
+LOCK_POLL_INTERVAL: float = 0.05
+
+
+def _new_version() -> int:
+    # Версия на основе времени не совпадёт с версией,
+    # вытесненной из кэша ранее.
+    return int(time.time() * 1000)
+
+
+def version_time(version: int) -> float:
+    """Время, не раньше которого пространство имён последний раз менялось."""
+    return version / 1000
+
+
+def get_version(namespace: str) -> int:
+    """Возвращает текущую версию пространства имён кэша."""
+    key = VERSION_KEY.format(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(namespaces) -> dict:
+    """Версии нескольких пространств имён за одно обращение к кэшу."""
+    keys = {
+        VERSION_KEY.format(namespace): namespace for namespace in namespaces
+    }
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        versions[key] = get_version(keys[key])
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_version(*namespaces: str) -> None:
+    """Делает недействительными все записи пространств имён.
+
+    Версия растёт как минимум до текущего времени в миллисекундах,
+    поэтому по ней же можно отдавать Last-Modified.
+    """
+    for namespace in namespaces:
+        key = VERSION_KEY.format(namespace)
+        now = _new_version()
+        version = cache.get(key)
+        if version is not None:
+            try:
+                cache.incr(key, max(1, now - version))
+                continue
+            except ValueError:
+                pass
+        cache.set(key, now, None)
+
+
+def get_or_build(
+    key: str, stale_key: str, build, timeout: int, store: bool = True
+):
+    """Возвращает значение из кэша или строит его один раз.
+
+    Пока один процесс перестраивает значение, остальные получают
+    последнюю сохранённую копию по `stale_key` или ждут результата.
+    С `store=False` недостающее значение строится без сохранения.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+    if not store:
+        return build()
+    lock_key = LOCK_KEY.format(key)
+    if cache.add(lock_key, True, settings.CACHE_LOCK_TIMEOUT):
+        try:
+            value = build()
+            cache.set_many({key: value, stale_key: value}, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+    value = cache.get(stale_key)
+    if value is not None:
+        return value
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return build()
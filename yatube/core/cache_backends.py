@@ -0,0 +1,601 @@
+"""Бэкенды кэша: LRU в памяти с лимитом в байтах и двухуровневый кэш.
+
+`MemoryCache` — замена LocMemCache: объём ограничен в байтах,
+а не числом записей, вытесняются самые давно прочитанные записи,
+большие значения сжимаются.
+
+`FileCache` — FileBasedCache с атомарными между процессами `add`
+и `incr`; `incr` сохраняет срок жизни ключа. Лишние файлы удаляются
+не при каждой записи, а не чаще раза в `CULL_INTERVAL` секунд.
+
+`TieredCache` — `MemoryCache` процесса (L1) перед любым бэкендом
+Django, общим для всех воркеров (файлы, база, Redis; L2). Запись идёт
+в L2, а изменённые ключи добавляются в журнал инвалидаций в том же L2.
+Каждый процесс не реже раза в `SYNC_INTERVAL` секунд дочитывает
+журнал и выбрасывает эти ключи из своего L1. Если журнал прочитать
+не удалось (записи вытеснены или номер сбросился), L1 очищается
+целиком. Свои записи процесс видит сразу. Внутри `batch()` (его
+открывает `core.middleware.CacheBatchMiddleware` на время запроса)
+изменённые ключи копятся и публикуются одной записью журнала.
+
+Пример настройки::
+
+    CACHES = {'default': {
+        'BACKEND': 'core.cache_backends.TieredCache',
+        'OPTIONS': {
+            'L2': {
+                'BACKEND': 'core.cache_backends.FileCache',
+                'LOCATION': '/var/tmp/yatube_cache',
+            },
+            'L1_MAX_BYTES': 32 * 1024 * 1024,
+        },
+    }}
+"""
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+from django.utils.module_loading import import_string
+
+SEQUENCE_KEY = 'tiered_cache:sequence'
+JOURNAL_KEY = 'tiered_cache:journal:{}'
+# Отметка в журнале «очистить L1 целиком».
+CLEAR_ALL = '*'
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class _Store:
+    """Общие данные всех экземпляров MemoryCache с одним LOCATION."""
+
+    def __init__(self):
+        # Ключ -> (данные, сжаты ли, момент истечения или None).
+        self.data = OrderedDict()
+        self.size = 0
+        self.lock = threading.RLock()
+        self.deletions = 0
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.counters = dict.fromkeys(('hits', 'misses', 'evictions'), 0)
+
+
+class MemoryCache(BaseCache):
+    """LRU в памяти процесса с ограничением объёма в байтах.
+
+    Экземпляры с одинаковым LOCATION делят хранилище, как
+    у LocMemCache. Размер записи — длина ключа и сериализованного
+    значения; значения от `COMPRESS_MIN_SIZE` байт сжимаются zlib,
+    если это их уменьшает.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.max_bytes = int(options.get('MAX_BYTES', 64 * 1024 * 1024))
+        self.compress_min_size = options.get('COMPRESS_MIN_SIZE', 16 * 1024)
+        self.compress_level = int(options.get('COMPRESS_LEVEL', 1))
+        with _stores_lock:
+            self._store = _stores.setdefault(location, _Store())
+
+    # Статистика.
+
+    @property
+    def deletions(self) -> int:
+        """Сколько раз записи удалялись явно, без учёта вытеснения."""
+        return self._store.deletions
+
+    def reset_stats(self) -> None:
+        self._store.reset_stats()
+
+    def stats(self) -> dict:
+        store = self._store
+        with store.lock:
+            stats = dict(
+                store.counters,
+                size=store.size,
+                max_bytes=self.max_bytes,
+                entries=len(store.data),
+            )
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / total if total else None
+        return stats
+
+    # Хранилище; вызывается под блокировкой.
+
+    def _encode(self, value) -> tuple:
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if (
+            self.compress_min_size is not None
+            and len(data) >= self.compress_min_size
+        ):
+            compressed = zlib.compress(data, self.compress_level)
+            if len(compressed) < len(data):
+                return compressed, True
+        return data, False
+
+    @staticmethod
+    def _decode(data: bytes, compressed: bool):
+        if compressed:
+            data = zlib.decompress(data)
+        return pickle.loads(data)
+
+    def _entry(self, key):
+        entry = self._store.data.get(key)
+        if entry is None:
+            return None
+        expires = entry[2]
+        if expires is not None and expires <= time.time():
+            self._remove(key)
+            return None
+        self._store.data.move_to_end(key)
+        return entry
+
+    def _remove(self, key) -> bool:
+        entry = self._store.data.pop(key, None)
+        if entry is None:
+            return False
+        self._store.size -= len(key) + len(entry[0])
+        return True
+
+    def _put(self, key, data: bytes, compressed: bool, expires) -> None:
+        store = self._store
+        self._remove(key)
+        size = len(key) + len(data)
+        if size > self.max_bytes:
+            return
+        store.data[key] = (data, compressed, expires)
+        store.size += size
+        while store.size > self.max_bytes:
+            old_key, (old_data, _, _) = store.data.popitem(last=False)
+            store.size -= len(old_key) + len(old_data)
+            store.counters['evictions'] += 1
+
+    # Интерфейс BaseCache.
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        store = self._store
+        with store.lock:
+            entry = self._entry(key)
+            if entry is None:
+                store.counters['misses'] += 1
+                return default
+            store.counters['hits'] += 1
+        return self._decode(entry[0], entry[1])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        data, compressed = self._encode(value)
+        with self._store.lock:
+            self._put(
+                key, data, compressed, self.get_backend_timeout(timeout)
+            )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        data, compressed = self._encode(value)
+        with self._store.lock:
+            if self._entry(key) is not None:
+                return False
+            self._put(
+                key, data, compressed, self.get_backend_timeout(timeout)
+            )
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._store.lock:
+            entry = self._entry(key)
+            if entry is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = self._decode(entry[0], entry[1]) + delta
+            self._put(key, *self._encode(value), entry[2])
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        with self._store.lock:
+            entry = self._entry(key)
+            if entry is None:
+                return False
+            self._store.data[key] = (
+                entry[0], entry[1], self.get_backend_timeout(timeout)
+            )
+            return True
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._store.lock:
+            return self._entry(key) is not None
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._store.lock:
+            self._store.deletions += 1
+            self._remove(key)
+
+    def clear(self):
+        store = self._store
+        with store.lock:
+            store.deletions += 1
+            store.data.clear()
+            store.size = 0
+
+
+class FileCache(FileBasedCache):
+    """FileBasedCache, у которого `add` и `incr` атомарны между процессами.
+
+    Новый файл появляется через `os.link`, который не перезаписывает
+    существующий. Просроченный файл и счётчик меняются под блокировкой
+    текущего файла ключа заменой на новый, поэтому читатели без
+    блокировки видят старое или новое значение целиком. `incr`
+    оставляет прежний срок жизни, а не ставит таймаут по умолчанию.
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        options = params.get('OPTIONS', {})
+        self.cull_interval = float(options.get('CULL_INTERVAL', 10))
+        self._culled_at = None
+
+    def _cull(self):
+        # Проверка перечисляет все файлы кэша: на каждую запись дорого.
+        now = time.monotonic()
+        if (
+            self._culled_at is not None
+            and now - self._culled_at < self.cull_interval
+        ):
+            return
+        self._culled_at = now
+        super()._cull()
+
+    def _write_temp(self, expiry, value) -> str:
+        self._createdir()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        with open(fd, 'wb') as f:
+            f.write(pickle.dumps(expiry, self.pickle_protocol))
+            f.write(zlib.compress(pickle.dumps(value, self.pickle_protocol)))
+        return tmp_path
+
+    def _locked(self, fname):
+        """Файл ключа под блокировкой или None, если его нет.
+
+        Блокировка берётся на конкретный файл, поэтому после неё
+        проверяется, что под этим именем всё ещё он.
+        """
+        while True:
+            try:
+                f = open(fname, 'rb')
+            except FileNotFoundError:
+                return None
+            locks.lock(f, locks.LOCK_EX)
+            try:
+                current = os.stat(fname).st_ino == os.fstat(f.fileno()).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                return f
+            locks.unlock(f)
+            f.close()
+
+    @staticmethod
+    def _read(f) -> tuple:
+        """(момент истечения, значение, истёк ли) из открытого файла."""
+        expiry = pickle.load(f)
+        if expiry is not None and expiry < time.time():
+            return expiry, None, True
+        return expiry, pickle.loads(zlib.decompress(f.read())), False
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        fname = self._key_to_file(key, version)
+        self._cull()
+        tmp_path = self._write_temp(self.get_backend_timeout(timeout), value)
+        try:
+            while True:
+                try:
+                    os.link(tmp_path, fname)
+                    return True
+                except FileExistsError:
+                    pass
+                f = self._locked(fname)
+                if f is None:
+                    continue
+                try:
+                    if not self._read(f)[2]:
+                        return False
+                    os.replace(tmp_path, fname)
+                    return True
+                finally:
+                    locks.unlock(f)
+                    f.close()
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def incr(self, key, delta=1, version=None):
+        fname = self._key_to_file(key, version)
+        f = self._locked(fname)
+        if f is None:
+            raise ValueError("Key '%s' not found" % key)
+        try:
+            expiry, value, expired = self._read(f)
+            if expired:
+                raise ValueError("Key '%s' not found" % key)
+            value += delta
+            os.replace(self._write_temp(expiry, value), fname)
+            return value
+        finally:
+            locks.unlock(f)
+            f.close()
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        l2_params = dict(options['L2'])
+        self.l2 = import_string(l2_params.pop('BACKEND'))(
+            l2_params.pop('LOCATION', ''), l2_params
+        )
+        self._worker = uuid.uuid4().hex
+        # L1 у каждого экземпляра свой: журнал читается по экземплярам.
+        l1_location = f'tiered_cache:{self._worker}'
+        self.l1 = MemoryCache(l1_location, {'OPTIONS': {
+            'MAX_BYTES': options.get('L1_MAX_BYTES', 32 * 1024 * 1024),
+            'COMPRESS_MIN_SIZE': options.get(
+                'L1_COMPRESS_MIN_SIZE', 16 * 1024
+            ),
+        }})
+        weakref.finalize(self, _stores.pop, l1_location, None)
+        self.l1_timeout = float(options.get('L1_TIMEOUT', 60))
+        self.sync_interval = float(options.get('SYNC_INTERVAL', 1))
+        self.journal_timeout = int(options.get('JOURNAL_TIMEOUT', 300))
+        self.journal_max = int(options.get('JOURNAL_MAX', 1000))
+        self._lock = threading.RLock()
+        self._batch = threading.local()
+        self._sequence = self.l2.get(SEQUENCE_KEY, 0)
+        self._synced_at = time.monotonic()
+        self.reset_stats()
+
+    # Статистика.
+
+    def reset_stats(self) -> None:
+        self.counters = dict.fromkeys(
+            ('l1_hits', 'l1_misses', 'l2_hits', 'l2_misses'), 0
+        )
+        self.l1.reset_stats()
+
+    def stats(self) -> dict:
+        """Попадания и промахи по уровням, объём и вытеснения L1."""
+        stats = dict(self.counters)
+        for tier in ('l1', 'l2'):
+            total = stats[f'{tier}_hits'] + stats[f'{tier}_misses']
+            stats[f'{tier}_hit_rate'] = (
+                stats[f'{tier}_hits'] / total if total else None
+            )
+        l1_stats = self.l1.stats()
+        for name in ('size', 'max_bytes', 'entries', 'evictions'):
+            stats[f'l1_{name}'] = l1_stats[name]
+        return stats
+
+    # L1.
+
+    def _l1_set(self, key, value, timeout=DEFAULT_TIMEOUT) -> None:
+        expires = self.get_backend_timeout(timeout)
+        ttl = self.l1_timeout
+        if expires is not None:
+            ttl = min(ttl, expires - time.time())
+        if ttl > 0:
+            self.l1.set(key, value, ttl)
+        else:
+            self.l1.delete(key)
+
+    # Журнал инвалидаций.
+
+    @contextmanager
+    def batch(self):
+        """Публикует ключи, изменённые внутри блока, одной записью."""
+        if getattr(self._batch, 'keys', None) is not None:
+            yield
+            return
+        self._batch.keys = keys = set()
+        try:
+            yield
+        finally:
+            self._batch.keys = None
+            if keys:
+                self._publish(list(keys))
+
+    def _changed(self, l1_keys) -> None:
+        pending = getattr(self._batch, 'keys', None)
+        if pending is None:
+            self._publish(l1_keys)
+        else:
+            pending.update(l1_keys)
+
+    def _publish(self, keys) -> None:
+        """Сообщает остальным процессам об изменённых ключах."""
+        try:
+            sequence = self.l2.incr(SEQUENCE_KEY)
+        except ValueError:
+            # Номер начинается со времени, а не с нуля: после очистки L2
+            # он не совпадёт с уже прочитанным другими процессами.
+            self.l2.add(SEQUENCE_KEY, int(time.time() * 1000), None)
+            sequence = self.l2.incr(SEQUENCE_KEY)
+        record = (self._worker, keys)
+        if not self.l2.add(
+            JOURNAL_KEY.format(sequence), record, self.journal_timeout
+        ):
+            # Номер уже занят: incr в L2 неатомарен (FileBasedCache,
+            # LocMemCache разных процессов).
+            self.l2.set(
+                JOURNAL_KEY.format(sequence),
+                (None, CLEAR_ALL),
+                self.journal_timeout,
+            )
+
+    def _sync(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._synced_at < self.sync_interval:
+            return
+        self._synced_at = now
+        sequence = self.l2.get(SEQUENCE_KEY, 0)
+        if sequence == self._sequence:
+            return
+        missed = range(self._sequence + 1, sequence + 1)
+        self._sequence = sequence
+        if not missed or len(missed) > self.journal_max:
+            self.l1.clear()
+            return
+        journal_keys = [JOURNAL_KEY.format(number) for number in missed]
+        records = self.l2.get_many(journal_keys)
+        if len(records) < len(journal_keys):
+            self.l1.clear()
+            return
+        for worker, keys in records.values():
+            if worker == self._worker:
+                continue
+            if keys == CLEAR_ALL:
+                self.l1.clear()
+                return
+            for key in keys:
+                self.l1.delete(key)
+
+    # Интерфейс BaseCache.
+
+    def get(self, key, default=None, version=None):
+        missing = object()
+        l1_key = self.make_key(key, version)
+        with self._lock:
+            self._sync()
+            value = self.l1.get(l1_key, missing)
+            if value is not missing:
+                self.counters['l1_hits'] += 1
+                return value
+            self.counters['l1_misses'] += 1
+            # Значение, прочитанное из L2 до чужой инвалидации,
+            # в L1 уже не кладётся.
+            deletions = self.l1.deletions
+        value = self.l2.get(key, missing, version=version)
+        with self._lock:
+            if value is missing:
+                self.counters['l2_misses'] += 1
+                return default
+            self.counters['l2_hits'] += 1
+            if deletions == self.l1.deletions:
+                self._l1_set(l1_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        missing = object()
+        found = {}
+        with self._lock:
+            self._sync()
+            for key in keys:
+                value = self.l1.get(self.make_key(key, version), missing)
+                if value is not missing:
+                    found[key] = value
+            self.counters['l1_hits'] += len(found)
+            rest = [key for key in keys if key not in found]
+            self.counters['l1_misses'] += len(rest)
+            deletions = self.l1.deletions
+        if not rest:
+            return found
+        from_l2 = self.l2.get_many(rest, version=version)
+        with self._lock:
+            self.counters['l2_hits'] += len(from_l2)
+            self.counters['l2_misses'] += len(rest) - len(from_l2)
+            if deletions == self.l1.deletions:
+                for key, value in from_l2.items():
+                    self._l1_set(self.make_key(key, version), value)
+        found.update(from_l2)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        self._stored({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version=version) or []
+        self._stored(data, timeout, version, failed)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self._stored({key: value}, timeout, version)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        # Срок жизни ключа знает только L2, поэтому в L1 значение
+        # не кладётся, а удаляется: следующее чтение возьмёт его из L2.
+        try:
+            return self.l2.incr(key, delta, version=version)
+        finally:
+            self._deleted([key], version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touched = self.l2.touch(key, timeout, version=version)
+        self._deleted([key], version)
+        return touched
+
+    def delete(self, key, version=None):
+        self.l2.delete(key, version=version)
+        self._deleted([key], version)
+
+    def delete_many(self, keys, version=None):
+        self.l2.delete_many(keys, version=version)
+        self._deleted(keys, version)
+
+    def has_key(self, key, version=None):
+        missing = object()
+        return self.get(key, missing, version=version) is not missing
+
+    def clear(self):
+        sequence = self.l2.get(SEQUENCE_KEY)
+        self.l2.clear()
+        if sequence is not None:
+            self.l2.add(SEQUENCE_KEY, sequence, None)
+        with self._lock:
+            self.l1.clear()
+        self._publish(CLEAR_ALL)
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
+
+    def _stored(self, data, timeout, version, failed=()) -> None:
+        l1_keys = []
+        with self._lock:
+            for key, value in data.items():
+                l1_key = self.make_key(key, version)
+                l1_keys.append(l1_key)
+                if key in failed:
+                    self.l1.delete(l1_key)
+                else:
+                    self._l1_set(l1_key, value, timeout)
+        self._changed(l1_keys)
+
+    def _deleted(self, keys, version) -> None:
+        l1_keys = [self.make_key(key, version) for key in keys]
+        with self._lock:
+            for l1_key in l1_keys:
+                self.l1.delete(l1_key)
+        self._changed(l1_keys)
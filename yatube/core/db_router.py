@@ -0,0 +1,94 @@
+"""Чтение с реплик для view, которые ничего не пишут.
+
+View помечается декоратором `replica_reads`, и на время запроса
+`ReplicaMiddleware` разрешает роутеру читать с реплик из
+`DATABASE_REPLICAS`. Запись всегда идёт в `default`. После запроса,
+который что-то записал (не GET/HEAD или сохранение модели), клиент
+получает cookie, и `REPLICA_PIN_SECONDS` секунд все его чтения идут
+с `default`, чтобы он видел свои изменения. Окно должно быть больше
+ожидаемого отставания реплик.
+
+Общий кэш тоже не должен прятать от клиента его изменения: в окне
+он не читает готовые страницы, а страница, собранная по реплике,
+не сохраняется, пока её зависимости менялись меньше окна назад.
+
+Локально реплику можно проверить копией базы::
+
+    cp db.sqlite3 db_replica.sqlite3
+
+и `DATABASE_REPLICAS = ['replica']` в настройках: копия отстаёт,
+пока её не обновят, а свои записи пользователь всё равно видит.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_state = threading.local()
+
+
+def replica_reads(view):
+    """Помечает view, чьи запросы можно читать с реплики."""
+    view.replica_reads = True
+    return view
+
+
+def use_replica(enabled: bool) -> None:
+    _state.use_replica = enabled
+
+
+def reading_replica() -> bool:
+    """Читает ли текущий запрос с реплик."""
+    return bool(settings.DATABASE_REPLICAS) and getattr(
+        _state, 'use_replica', False
+    )
+
+
+def pinned(request) -> bool:
+    """Клиент недавно что-то записал и читает только с `default`."""
+    if not settings.DATABASE_REPLICAS:
+        return False
+    try:
+        pinned_until = float(
+            request.COOKIES.get(settings.REPLICA_PIN_COOKIE, 0)
+        )
+    except ValueError:
+        return False
+    return pinned_until > time.time()
+
+
+def may_lag(changed_at: float) -> bool:
+    """Реплика, с которой читает запрос, может не видеть изменение."""
+    return (
+        reading_replica()
+        and time.time() - changed_at < settings.REPLICA_PIN_SECONDS
+    )
+
+
+def mark_write() -> None:
+    """Отмечает, что текущий запрос что-то записал."""
+    _state.wrote = True
+
+
+def pop_write() -> bool:
+    wrote = getattr(_state, 'wrote', False)
+    _state.wrote = False
+    return wrote
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if reading_replica():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
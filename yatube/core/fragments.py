@@ -0,0 +1,14 @@
+"""Персональные части общих страниц сайта."""
+from django.template.loader import render_to_string
+
+from core.page_cache import personal_fragment
+
+
+@personal_fragment('user_nav')
+def user_nav(request, post_id=None, author_id=None) -> str:
+    """Пункты меню пользователя; на странице поста — ссылка на правку."""
+    return render_to_string(
+        'includes/user_nav.html',
+        {'post_id': post_id, 'author_id': author_id},
+        request=request,
+    )
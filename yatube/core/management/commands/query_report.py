@@ -0,0 +1,49 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.utils import percentile
+
+METRICS = ('queries', 'db_ms', 'template_ms', 'total_ms')
+
+
+class Command(BaseCommand):
+    help = 'Сводит лог QueryBudgetMiddleware в таблицу p50/p95 по view.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'log',
+            nargs='?',
+            default=settings.QUERY_BUDGET_LOG_FILE,
+            help='Путь к логу, по умолчанию QUERY_BUDGET_LOG_FILE.',
+        )
+
+    def handle(self, *args, **options):
+        samples = defaultdict(lambda: defaultdict(list))
+        with open(options['log'], encoding='utf-8') as log:
+            for line in log:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                for metric in METRICS:
+                    samples[record['view']][metric].append(record[metric])
+        header = ['view', 'hits'] + [
+            f'{metric} p{percent}'
+            for metric in METRICS
+            for percent in (50, 95)
+        ]
+        rows = [header]
+        for view, metrics in sorted(samples.items(), key=str):
+            row = [str(view), str(len(metrics['total_ms']))]
+            for metric in METRICS:
+                for percent in (50, 95):
+                    row.append(f'{percentile(metrics[metric], percent):g}')
+            rows.append(row)
+        widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+        for row in rows:
+            self.stdout.write('  '.join(
+                cell.ljust(width) for cell, width in zip(row, widths)
+            ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.template_warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Компилирует все шаблоны проекта: проверка перед выкладкой '
+        'и замер времени прогрева.'
+    )
+
+    def handle(self, *args, **options):
+        names = warm_templates()
+        self.stdout.write(f'Шаблонов: {len(names)}')
@@ -0,0 +1,161 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core import db_router
+
+logger = logging.getLogger('core.query_budget')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = threading.local()
+
+
+def current_stats():
+    """Статистика текущего запроса или None вне QueryBudgetMiddleware."""
+    return getattr(_state, 'stats', None)
+
+
+class RequestStats:
+    """Запросы к базе и время шаблонов в рамках одного HTTP-запроса."""
+
+    def __init__(self):
+        self.queries = Counter()
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.render_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries[sql] += 1
+
+    @contextmanager
+    def rendering(self):
+        """Считает время шаблона; вложенные рендеры не суммируются."""
+        self.render_depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.render_depth -= 1
+            if not self.render_depth:
+                self.template_time += time.perf_counter() - start
+
+    def duplicates(self) -> list:
+        return [
+            {'sql': sql, 'count': count}
+            for sql, count in self.queries.most_common()
+            if count > 1
+        ]
+
+
+class QueryBudgetMiddleware:
+    """Замеряет запросы к базе и рендеринг шаблонов для каждого view.
+
+    Результат отдаётся заголовком `Server-Timing` и строкой JSON
+    в логгер `core.query_budget`. Включается `QUERY_BUDGET_ENABLED`.
+    Если бэкенд кэша считает попадания по уровням (`TieredCache`),
+    в лог попадают и они. Время шаблонов считает бэкенд
+    `core.template_backends.TimedDjangoTemplates`.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        _state.stats = stats
+        cache_before = dict(getattr(cache, 'counters', {}))
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _state.stats = None
+        total_time = time.perf_counter() - start
+        query_count = sum(stats.queries.values())
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={stats.db_time * 1000:.2f};desc="{query_count} queries"',
+            f'tpl;dur={stats.template_time * 1000:.2f}',
+            f'total;dur={total_time * 1000:.2f}',
+        ))
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'view': match.view_name if match else None,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': query_count,
+            'db_ms': round(stats.db_time * 1000, 2),
+            'template_ms': round(stats.template_time * 1000, 2),
+            'total_ms': round(total_time * 1000, 2),
+            'duplicates': stats.duplicates(),
+            'cache': {
+                name: count - cache_before.get(name, 0)
+                for name, count in getattr(cache, 'counters', {}).items()
+            },
+        }, ensure_ascii=False))
+        return response
+
+
+class CacheBatchMiddleware:
+    """Публикует инвалидации `TieredCache` одной записью на запрос."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        batch = getattr(cache, 'batch', None)
+        if batch is None:
+            return self.get_response(request)
+        with batch():
+            return self.get_response(request)
+
+
+class ReplicaMiddleware:
+    """Разрешает view с `replica_reads` читать с реплик.
+
+    Запрос, который что-то записал, ставит cookie `REPLICA_PIN_COOKIE`
+    со временем окончания окна; пока оно не истекло, чтения клиента
+    идут с основной базы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        db_router.pop_write()
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.use_replica(False)
+        if db_router.pop_write() or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                str(time.time() + settings.REPLICA_PIN_SECONDS),
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        db_router.use_replica(
+            getattr(view_func, 'replica_reads', False)
+            and request.method in SAFE_METHODS
+            and not db_router.pinned(request)
+        )
@@ -1,5 +1,7 @@
 from django.db import models
 
+from core.text import RENDERED_FIELDS, render_text
+
 
 class PubDateModel(models.Model):
     """Абстрактная модель. Добавляет дату создания."""
@@ -11,3 +13,37 @@ class PubDateModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class RenderedTextModel(models.Model):
+    """Абстрактная модель. Хранит HTML поля `text` и его анонс.
+
+    Ленты читают только анонс, полный текст загружает страница записи.
+    """
+    text_html = models.TextField(
+        'HTML текста',
+        blank=True,
+        editable=False,
+    )
+    excerpt = models.TextField(
+        'анонс',
+        blank=True,
+        editable=False,
+    )
+    text_truncated = models.BooleanField(
+        'анонс короче текста',
+        default=False,
+        editable=False,
+    )
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            for field, value in render_text(self.text).items():
+                setattr(self, field, value)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *RENDERED_FIELDS}
+        super().save(*args, **kwargs)
@@ -0,0 +1,211 @@
+"""Кэш целых страниц, общий для всех посетителей, и условные GET.
+
+View подключает кэш декоратором `shared_page_cache` и сообщает,
+от каких объектов зависит страница, через `depends_on`. Вместе со
+страницей сохраняются версии этих объектов из `core.cache`; сигналы
+моделей поднимают версии, и страница перестаёт совпадать. Попадание
+в кэш для гостя обслуживается без запросов к базе. Результат виден
+в заголовке `X-Page-Cache: hit|miss`.
+
+Всё, что зависит от пользователя (меню, CSRF-токен, кнопка подписки),
+шаблоны выводят тегом `{% personal %}`. Для общей копии страницы тег
+оставляет метку, а функция, зарегистрированная `personal_fragment`,
+заполняет её заново на каждый запрос. Поэтому одна копия страницы
+годится и гостю, и любому авторизованному пользователю.
+
+Декоратор `conditional_page` по тем же версиям выставляет ETag
+и Last-Modified и отвечает 304 ещё до отрисовки шаблона, поэтому
+view должен возвращать `TemplateResponse`.
+"""
+import hashlib
+import re
+import secrets
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import translation
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.utils.safestring import mark_safe
+
+from core import db_router
+from core.cache import get_versions, version_time
+from core.paginator import decode_cursor
+
+PAGE_KEY = 'shared_page:{}'
+CACHE_HEADER = 'X-Page-Cache'
+# Параметры, от которых зависит страница; с другими кэш не используется.
+PAGE_PARAMS = frozenset(('page', 'cursor'))
+# Метка персональной части. Токен случайный для каждой копии
+# страницы, поэтому текст постов не может её подделать.
+HOLE_MARK = '<!--personal:{}:{}-->'
+HOLE_RE = r'<!--personal:{}:(\d+)-->'
+
+_fragments = {}
+
+
+def model_namespace(model, pk=None) -> str:
+    """Пространство имён страниц, зависящих от модели или объекта."""
+    label = model._meta.label_lower
+    return f'page:{label}' if pk is None else f'page:{label}:{pk}'
+
+
+def depends_on(request, *namespaces: str) -> None:
+    """Отмечает, что страница зависит от пространств имён."""
+    request_namespaces = getattr(request, 'page_cache_namespaces', None)
+    if request_namespaces is not None:
+        request_namespaces.update(namespaces)
+
+
+def page_key(request) -> str:
+    cursor = request.GET.get('cursor', '')
+    if cursor and decode_cursor(cursor) is None:
+        # Все битые курсоры дают первую страницу и одну запись кэша.
+        cursor = ''
+    raw = '|'.join((
+        request.path,
+        request.GET.get('page', ''),
+        cursor,
+        getattr(request, 'LANGUAGE_CODE', translation.get_language()),
+    ))
+    return PAGE_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+
+def is_cacheable(request) -> bool:
+    return (
+        request.method in ('GET', 'HEAD')
+        and request.GET.keys() <= PAGE_PARAMS
+    )
+
+
+def personal_fragment(name: str):
+    """Регистрирует функцию `(request, **kwargs) -> str` для `{% personal %}`.
+
+    Аргументы приходят из шаблона и хранятся в кэше вместе со
+    страницей, поэтому это должны быть простые значения: id, строки.
+    """
+    def decorator(func):
+        _fragments[name] = func
+        return func
+    return decorator
+
+
+def personal(request, name: str, kwargs: dict) -> str:
+    """Персональная часть страницы или метка для её заполнения."""
+    holes = getattr(request, 'page_holes', None)
+    if holes is None:
+        return _fragments[name](request, **kwargs)
+    holes.append((name, kwargs))
+    return mark_safe(HOLE_MARK.format(request.page_hole_token, len(holes) - 1))
+
+
+def fill_holes(request, content: bytes, token: str, holes: list) -> bytes:
+    """Подставляет в страницу персональные части текущего запроса."""
+    if not holes:
+        return content
+    fragments = [
+        _fragments[name](request, **kwargs).encode(settings.DEFAULT_CHARSET)
+        for name, kwargs in holes
+    ]
+    return re.sub(
+        HOLE_RE.format(token).encode(),
+        lambda match: fragments[int(match.group(1))],
+        content,
+    )
+
+
+def conditional_response(request, versions: dict, response):
+    """Выставляет валидаторы страницы и при совпадении отдаёт 304.
+
+    ETag слабый: страница для одного и того же пользователя совпадает
+    по смыслу, но не побайтно (маска CSRF-токена).
+    """
+    raw = '|'.join((
+        request.get_full_path(),
+        str(request.user.pk or ''),
+        *(f'{ns}={versions[ns]}' for ns in sorted(versions)),
+    ))
+    response['ETag'] = f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+    last_modified = min(
+        max(map(version_time, versions.values())), time.time()
+    )
+    response['Last-Modified'] = http_date(last_modified)
+    return get_conditional_response(
+        request,
+        etag=response['ETag'],
+        last_modified=int(last_modified),
+        response=response,
+    )
+
+
+def conditional_page(view):
+    """Отвечает 304, если зависимости страницы не менялись."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if getattr(request, 'page_cache_namespaces', None) is None:
+            request.page_cache_namespaces = set()
+        response = view(request, *args, **kwargs)
+        if response.status_code != 200 or not request.page_cache_namespaces:
+            return response
+        return conditional_response(
+            request, get_versions(request.page_cache_namespaces), response
+        )
+    return wrapper
+
+
+def shared_page_cache(view):
+    """Отдаёт страницу из кэша, заполняя персональные части."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not is_cacheable(request):
+            return view(request, *args, **kwargs)
+        key = page_key(request)
+        # Клиент после записи может застать копию, собранную до неё.
+        entry = None if db_router.pinned(request) else cache.get(key)
+        if entry is not None:
+            versions, content, content_type, token, holes = entry
+            if get_versions(versions) == versions:
+                response = conditional_response(
+                    request, versions, HttpResponse(content_type=content_type)
+                )
+                if response.status_code == 200:
+                    response.content = fill_holes(
+                        request, content, token, holes
+                    )
+                response[CACHE_HEADER] = 'hit'
+                return response
+        request.page_cache_namespaces = set()
+        request.page_holes = holes = []
+        request.page_hole_token = token = secrets.token_hex(8)
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+        finally:
+            # Страницы ошибок отрисовываются после view уже без меток.
+            request.page_holes = None
+        if response.streaming:
+            return response
+        versions = get_versions(request.page_cache_namespaces)
+        if (
+            response.status_code == 200
+            and not response.cookies
+            and versions
+            and not db_router.may_lag(
+                max(map(version_time, versions.values()))
+            )
+        ):
+            cache.set(key, (
+                versions,
+                response.content,
+                response['Content-Type'],
+                token,
+                holes,
+            ), settings.PAGE_CACHE_TIMEOUT)
+        response.content = fill_holes(request, response.content, token, holes)
+        response[CACHE_HEADER] = 'miss'
+        return response
+    return wrapper
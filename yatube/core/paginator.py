@@ -0,0 +1,188 @@
+import base64
+import binascii
+from datetime import datetime
+from functools import lru_cache
+
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction: str, key, pk) -> str:
+    """Кодирует позицию (ключ, pk) в непрозрачный токен для `?cursor=`."""
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    raw = f'{direction}|{key}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, parse_key=parse_datetime):
+    """Возвращает (направление, ключ, pk) или None для битого токена."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, key, pk = raw.decode().split('|')
+        key = parse_key(key)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or key is None:
+        return None
+    return direction, key, pk
+
+
+@lru_cache(maxsize=1024)
+def page_window(number: int, num_pages: int, on_each_side: int = 2,
+                on_ends: int = 1) -> tuple:
+    """Номера страниц для навигации: края и окно вокруг текущей.
+
+    Пропуски между ними обозначены None. Размер результата не зависит
+    от числа страниц, поэтому навигация по миллиону постов такая же
+    короткая, как по сотне.
+    """
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        return tuple(range(1, num_pages + 1))
+    pages = []
+    if number > on_each_side + on_ends + 2:
+        pages.extend(range(1, on_ends + 1))
+        pages.append(None)
+        pages.extend(range(number - on_each_side, number + 1))
+    else:
+        pages.extend(range(1, number + 1))
+    if number < num_pages - on_each_side - on_ends - 1:
+        pages.extend(range(number + 1, number + on_each_side + 1))
+        pages.append(None)
+        pages.extend(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        pages.extend(range(number + 1, num_pages + 1))
+    return tuple(pages)
+
+
+def keyset_filter(queryset, position, direction: str,
+                  date_field: str = 'pub_date', pk_field: str = 'pk'):
+    """Фильтрует и сортирует queryset по ключу (дата, pk) от позиции."""
+    if direction == NEXT:
+        lookup, ordering = 'lt', (f'-{date_field}', f'-{pk_field}')
+    else:
+        lookup, ordering = 'gt', (date_field, pk_field)
+    if position is not None:
+        pub_date, pk = position
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__{lookup}': pub_date})
+            | Q(**{date_field: pub_date, f'{pk_field}__{lookup}': pk})
+        )
+    return queryset.order_by(*ordering)
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (pub_date, pk).
+
+    Кроме обычных номерных страниц умеет отдавать страницы по курсору:
+    без COUNT(*) и OFFSET, используя индекс по `pub_date`.
+    Общее количество можно передать функцией `count`, например
+    закэшированным счётчиком.
+    """
+
+    parse_key = staticmethod(parse_datetime)
+
+    def __init__(self, *args, count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        if self._count is not None:
+            return self._count()
+        return super().count
+
+    def position(self, obj) -> tuple:
+        """Ключ сортировки объекта: (значение, pk)."""
+        return obj.pub_date, obj.pk
+
+    def fetch(self, position, direction: str, limit: int) -> list:
+        """Возвращает до `limit` объектов за позицией в направлении.
+
+        Подклассы переопределяют метод, чтобы читать страницу
+        из другого источника.
+        """
+        return list(
+            keyset_filter(self.object_list, position, direction)[:limit]
+        )
+
+    def get_cursor_page(self, cursor=None) -> Page:
+        decoded = decode_cursor(cursor, self.parse_key) if cursor else None
+        if decoded is None:
+            direction, position = NEXT, None
+        else:
+            direction, position = decoded[0], decoded[1:]
+        objects = self.fetch(position, direction, self.per_page + 1)
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if direction == PREVIOUS:
+            objects.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, decoded is not None
+        page = Page(objects, None, self)
+        page.keyset = True
+        # Битый курсор не попадает в ключи кэша: это первая страница.
+        page.cursor = cursor if decoded is not None else ''
+        page.next_cursor = (
+            encode_cursor(NEXT, *self.position(objects[-1]))
+            if has_next and objects else None
+        )
+        page.previous_cursor = (
+            encode_cursor(PREVIOUS, *self.position(objects[0]))
+            if has_previous and objects else None
+        )
+        return page
+
+
+def estimated_count(model, using: str = 'default'):
+    """Примерное число строк таблицы из статистики СУБД или None.
+
+    На SQLite статистика появляется после `ANALYZE`.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [table],
+            )
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None
+        if connection.vendor != 'sqlite':
+            return None
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        )
+        if cursor.fetchone() is None:
+            return None
+        cursor.execute(
+            'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table]
+        )
+        row = cursor.fetchone()
+    return int(row[0].split()[0]) if row else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который не считает COUNT(*) по всей таблице.
+
+    Для queryset без фильтров берётся оценка из статистики СУБД,
+    отфильтрованные queryset считаются как обычно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None:
+                return estimate
+        return super().count
@@ -0,0 +1,10 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .db_router import mark_write
+
+
+@receiver((post_save, post_delete, m2m_changed))
+def pin_after_write(sender, **kwargs):
+    """Запрос с записью закрепляет клиента за основной базой."""
+    mark_write()
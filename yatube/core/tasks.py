@@ -0,0 +1,48 @@
+"""Фоновые задачи в пуле потоков текущего процесса."""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_WORKERS,
+            thread_name_prefix='background',
+        )
+    return _executor
+
+
+def _run(func, *args) -> None:
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Фоновая задача %s завершилась ошибкой', func)
+
+
+def _run_in_worker(func, *args) -> None:
+    try:
+        _run(func, *args)
+    finally:
+        connections.close_all()
+
+
+def run_in_background(func, *args) -> None:
+    """Выполняет задачу после коммита транзакции вне запроса.
+
+    При `BACKGROUND_WORKERS = 0` задача выполняется сразу после
+    коммита в текущем потоке.
+    """
+    def submit():
+        if settings.BACKGROUND_WORKERS:
+            get_executor().submit(_run_in_worker, func, *args)
+        else:
+            _run(func, *args)
+    transaction.on_commit(submit)
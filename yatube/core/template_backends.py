@@ -0,0 +1,26 @@
+"""Бэкенд шаблонов Django, который сообщает время рендеринга.
+
+Время попадает в статистику `QueryBudgetMiddleware` текущего запроса;
+вне неё шаблоны рендерятся как обычно.
+"""
+from django.template.backends.django import DjangoTemplates, Template
+
+from core.middleware import current_stats
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = current_stats()
+        if stats is None:
+            return super().render(context, request)
+        with stats.rendering():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
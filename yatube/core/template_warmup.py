@@ -0,0 +1,39 @@
+"""Компиляция шаблонов проекта заранее, а не на первом запросе.
+
+С кэширующим загрузчиком скомпилированный шаблон остаётся в памяти
+процесса. Если прогреть шаблоны в мастер-процессе до форка (например,
+`gunicorn --preload`), воркеры получают их копией при записи.
+"""
+import os
+
+from django.conf import settings
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+def project_template_names() -> list:
+    """Имена всех шаблонов из каталогов проекта, без сторонних пакетов."""
+    names = set()
+    dirs = engines['django'].engine.dirs
+    for directory in map(str, [*dirs, *get_app_template_dirs('templates')]):
+        if not directory.startswith(settings.BASE_DIR):
+            continue
+        for root, _, files in os.walk(directory):
+            for file_name in files:
+                if not file_name.endswith(TEMPLATE_EXTENSIONS):
+                    continue
+                path = os.path.join(root, file_name)
+                path = os.path.relpath(path, directory)
+                names.add(path.replace(os.sep, '/'))
+    return sorted(names)
+
+
+def warm_templates() -> list:
+    """Компилирует шаблоны проекта и возвращает их имена."""
+    names = project_template_names()
+    engine = engines['django']
+    for name in names:
+        engine.get_template(name)
+    return names
@@ -0,0 +1,16 @@
+from django import template
+
+from core import page_cache
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def personal(context, name, **kwargs):
+    """Часть страницы, которая отрисовывается на каждый запрос.
+
+    Использование::
+
+        {% personal 'follow_button' author_id=author.pk %}
+    """
+    return page_cache.personal(context['request'], name, kwargs)
@@ -0,0 +1,59 @@
+from django import template
+from django.conf import settings
+from django.core.cache.utils import make_template_fragment_key
+
+from core import db_router
+from core.cache import get_version, get_or_build, version_time
+
+register = template.Library()
+
+
+class VersionedCacheNode(template.Node):
+    def __init__(self, nodelist, namespace, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.namespace = namespace
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        request = context.get('request')
+        if request is not None and db_router.pinned(request):
+            return self.nodelist.render(context)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        stale_key = make_template_fragment_key(self.fragment_name, vary_on)
+        version = get_version(self.namespace)
+        key = make_template_fragment_key(
+            self.fragment_name, [version, *vary_on]
+        )
+        return get_or_build(
+            key,
+            stale_key,
+            lambda: self.nodelist.render(context),
+            settings.VERSIONED_CACHE_TIMEOUT,
+            store=not db_router.may_lag(version_time(version)),
+        )
+
+
+@register.tag('versioned_cache')
+def do_versioned_cache(parser, token):
+    """Кэширует фрагмент до смены версии пространства имён.
+
+    Использование::
+
+        {% versioned_cache namespace fragment_name [var1] [var2] ... %}
+        ...
+        {% endversioned_cache %}
+    """
+    nodelist = parser.parse(('endversioned_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 2 arguments."
+        )
+    return VersionedCacheNode(
+        nodelist,
+        tokens[1],
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+    )
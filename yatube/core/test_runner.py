@@ -0,0 +1,37 @@
+import copy
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+@contextmanager
+def temp_cache_dir():
+    """Файловый кэш во временном каталоге, а не в BASE_DIR."""
+    cache_dir = tempfile.mkdtemp(prefix='yatube_cache_')
+    caches = copy.deepcopy(settings.CACHES)
+    caches['default']['OPTIONS']['L2']['LOCATION'] = cache_dir
+    try:
+        with override_settings(CACHES=caches):
+            yield cache_dir
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+class TempCacheRunner(DiscoverRunner):
+    """Тесты `manage.py test` пишут кэш во временный каталог.
+
+    Для pytest то же делает `tests/conftest.py`.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.temp_cache = temp_cache_dir()
+        self.temp_cache.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self.temp_cache.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,240 @@
+import shutil
+import tempfile
+import time
+import uuid
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from core.cache_backends import (
+    JOURNAL_KEY, SEQUENCE_KEY, FileCache, MemoryCache, TieredCache,
+)
+
+
+class TieredCacheTest(SimpleTestCase):
+    """Два «воркера» с общим L2 в памяти."""
+
+    def setUp(self):
+        self.location = uuid.uuid4().hex
+        self.worker, self.other_worker = self.make_cache(), self.make_cache()
+
+    def make_cache(self, **options):
+        options.setdefault('SYNC_INTERVAL', 0)
+        return TieredCache('', {'OPTIONS': {
+            'L2': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': self.location,
+            },
+            **options,
+        }})
+
+    def test_second_read_served_by_l1(self):
+        self.worker.set('key', 'value')
+        self.assertEqual(self.other_worker.get('key'), 'value')
+        self.assertEqual(self.other_worker.get('key'), 'value')
+        self.assertEqual(self.other_worker.get('missing'), None)
+        stats = self.other_worker.stats()
+        self.assertEqual(stats['l1_hits'], 1)
+        self.assertEqual(stats['l1_misses'], 2)
+        self.assertEqual(stats['l2_hits'], 1)
+        self.assertEqual(stats['l2_hit_rate'], 0.5)
+
+    def test_write_invalidates_other_l1(self):
+        """Запись в одном процессе выбрасывает ключ из L1 остальных."""
+        self.worker.set('key', 'old')
+        self.other_worker.get('key')
+        for write in (
+            lambda: self.worker.set('key', 'new'),
+            lambda: self.worker.set_many({'key': 'new'}),
+        ):
+            write()
+            self.assertEqual(self.other_worker.get('key'), 'new')
+            self.worker.set('key', 'old')
+            self.assertEqual(self.other_worker.get('key'), 'old')
+        self.worker.delete('key')
+        self.assertIsNone(self.other_worker.get('key'))
+
+    def test_incr_and_add_visible_to_other_worker(self):
+        self.worker.set('counter', 1)
+        self.other_worker.get('counter')
+        self.assertEqual(self.worker.incr('counter', 5), 6)
+        self.assertEqual(self.other_worker.get('counter'), 6)
+        self.assertTrue(self.other_worker.add('lock', 1))
+        self.assertFalse(self.worker.add('lock', 2))
+
+    def test_sync_interval(self):
+        """Чужие записи видны не позже чем через SYNC_INTERVAL."""
+        lazy_worker = self.make_cache(SYNC_INTERVAL=3600)
+        self.worker.set('key', 'old')
+        lazy_worker.get('key')
+        self.worker.set('key', 'new')
+        self.assertEqual(lazy_worker.get('key'), 'old')
+        lazy_worker._sync(force=True)
+        self.assertEqual(lazy_worker.get('key'), 'new')
+
+    def test_lost_journal_clears_l1(self):
+        """Без записей журнала L1 очищается целиком."""
+        self.worker.set('key', 'old')
+        self.other_worker.get('key')
+        self.worker.set('key', 'new')
+        self.worker.l2.delete_many(
+            [JOURNAL_KEY.format(number) for number in range(1, 10)]
+        )
+        self.assertEqual(self.other_worker.get('key'), 'new')
+
+    def test_clear(self):
+        self.worker.set('key', 'value')
+        self.other_worker.get('key')
+        self.worker.clear()
+        self.assertIsNone(self.other_worker.get('key'))
+        self.assertIsNone(self.worker.get('key'))
+
+    def test_stats_include_l1_size(self):
+        self.worker.set('key', 'value')
+        stats = self.worker.stats()
+        self.assertEqual(stats['l1_entries'], 1)
+        self.assertGreater(stats['l1_size'], len('value'))
+        self.assertEqual(stats['l1_evictions'], 0)
+
+    def test_l1_values_are_copies(self):
+        self.worker.set('key', [1])
+        self.worker.get('key').append(2)
+        self.assertEqual(self.worker.get('key'), [1])
+
+    def test_batch_publishes_one_record(self):
+        """Ключи, изменённые в batch(), уходят одной записью журнала."""
+        self.worker.set_many({'a': 'old', 'b': 'old', 'c': 'old'})
+        self.other_worker.get_many(['a', 'b', 'c'])
+        sequence = self.worker.l2.get(SEQUENCE_KEY)
+        with self.worker.batch():
+            self.worker.set('a', 'new')
+            self.worker.add('lock', True)
+            self.worker.delete('b')
+            with self.worker.batch():
+                self.worker.set('c', 'new')
+            self.assertEqual(self.worker.get('a'), 'new')
+            self.assertEqual(self.other_worker.get('a'), 'old')
+        self.assertEqual(self.worker.l2.get(SEQUENCE_KEY), sequence + 1)
+        self.assertEqual(
+            self.other_worker.get_many(['a', 'b', 'c']),
+            {'a': 'new', 'c': 'new'},
+        )
+
+    def test_l2_is_shared_store(self):
+        self.worker.set('key', 'value')
+        self.assertEqual(
+            LocMemCache(self.location, {}).get('key'), 'value'
+        )
+
+
+class FileCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        self.cache = FileCache(self.location, {'TIMEOUT': None})
+
+    def test_incr_keeps_timeout(self):
+        """incr не делает ключ со сроком жизни вечным."""
+        self.cache.set('counter', 1, 10)
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        with mock.patch('time.time', return_value=time.time() + 11):
+            self.assertIsNone(self.cache.get('counter'))
+            with self.assertRaises(ValueError):
+                self.cache.incr('counter')
+
+    def test_incr_missing_key(self):
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_add_only_missing_or_expired(self):
+        self.assertTrue(self.cache.add('lock', 1, 10))
+        self.assertFalse(self.cache.add('lock', 2, 10))
+        self.assertEqual(self.cache.get('lock'), 1)
+        with mock.patch('time.time', return_value=time.time() + 11):
+            self.assertTrue(self.cache.add('lock', 3, 10))
+        self.assertEqual(self.cache.get('lock'), 3)
+
+    def test_tiered_incr_keeps_l2_timeout(self):
+        tiered = TieredCache('', {'OPTIONS': {'L2': {
+            'BACKEND': 'core.cache_backends.FileCache',
+            'LOCATION': self.location,
+            'TIMEOUT': None,
+        }}})
+        tiered.set('counter', 1, 10)
+        self.assertEqual(tiered.incr('counter'), 2)
+        self.assertEqual(tiered.get('counter'), 2)
+        with mock.patch('time.time', return_value=time.time() + 11):
+            self.assertIsNone(tiered.l2.get('counter'))
+
+    def test_cull_throttled(self):
+        """Каталог перебирается не чаще раза в CULL_INTERVAL."""
+        cache = FileCache(self.location, {'OPTIONS': {
+            'MAX_ENTRIES': 2, 'CULL_FREQUENCY': 1, 'CULL_INTERVAL': 3600,
+        }})
+        for number in range(4):
+            cache.add(f'key{number}', number)
+        self.assertEqual(len(cache._list_cache_files()), 4)
+        cache._culled_at -= 3600
+        cache.set('key4', 4)
+        self.assertEqual(len(cache._list_cache_files()), 1)
+
+
+class MemoryCacheTest(SimpleTestCase):
+    def make_cache(self, **options):
+        return MemoryCache(uuid.uuid4().hex, {'OPTIONS': options})
+
+    def test_bounded_by_bytes_in_lru_order(self):
+        """Вытесняются давно прочитанные записи, пока объём выше лимита."""
+        cache = self.make_cache(MAX_BYTES=1000, COMPRESS_MIN_SIZE=None)
+        for key in 'abc':
+            cache.set(key, 'x' * 250)
+        cache.get('a')
+        cache.set('d', 'x' * 250)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'x' * 250)
+        stats = cache.stats()
+        self.assertLessEqual(stats['size'], 1000)
+        self.assertEqual(stats['entries'], 3)
+        self.assertEqual(stats['evictions'], 1)
+        cache.set('big', 'x' * 600)
+        self.assertEqual(cache.stats()['entries'], 2)
+
+    def test_too_large_value_not_stored(self):
+        cache = self.make_cache(MAX_BYTES=100, COMPRESS_MIN_SIZE=None)
+        cache.set('small', 1)
+        cache.set('huge', 'x' * 1000)
+        self.assertIsNone(cache.get('huge'))
+        self.assertEqual(cache.get('small'), 1)
+
+    def test_large_values_compressed(self):
+        cache = self.make_cache(COMPRESS_MIN_SIZE=1024)
+        page = '<article>Тестовый текст</article>' * 1000
+        cache.set('page', page)
+        self.assertEqual(cache.get('page'), page)
+        self.assertLess(cache.stats()['size'], len(page) // 10)
+
+    def test_counters(self):
+        cache = self.make_cache()
+        cache.set('key', 'value')
+        cache.get('key')
+        cache.get('missing')
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_incr_and_expiry(self):
+        cache = self.make_cache()
+        cache.set('counter', 1, 60)
+        self.assertEqual(cache.incr('counter', 2), 3)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        cache.set('expired', 1, -1)
+        self.assertFalse(cache.has_key('expired'))
+        self.assertTrue(cache.add('expired', 2))
+        self.assertFalse(cache.add('expired', 3))
+
+    def test_shared_by_location(self):
+        location = uuid.uuid4().hex
+        MemoryCache(location, {}).set('key', 'value')
+        self.assertEqual(MemoryCache(location, {}).get('key'), 'value')
@@ -0,0 +1,116 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.test import (
+    SimpleTestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.db_router import ReplicaRouter, use_replica
+from core.page_cache import CACHE_HEADER
+from posts.models import Post, User
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(SimpleTestCase):
+    def tearDown(self):
+        use_replica(False)
+
+    def test_reads_from_replica_only_when_allowed(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), 'default')
+        use_replica(True)
+        self.assertEqual(router.db_for_read(Post), 'replica')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(router.db_for_read(Post), 'default')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaMiddlewareTest(TransactionTestCase):
+    """В тестах `replica` — зеркало `default`, данные у них общие."""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.test_author = User.objects.create(username='TestAuthor')
+        User.objects.create(username='OtherAuthor')
+        self.test_post = Post.objects.create(
+            text='Тестовый текст',
+            author=self.test_author,
+        )
+        self.client.force_login(self.test_author)
+
+    def get_queries(self, url) -> dict:
+        """Число запросов к каждой базе при GET `url`."""
+        with CaptureQueriesContext(connections['default']) as primary:
+            with CaptureQueriesContext(connections['replica']) as replica:
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return {'default': len(primary), 'replica': len(replica)}
+
+    def test_read_only_views_use_replica(self):
+        for url in (
+            reverse('posts:posts'),
+            reverse('posts:profile', args=['TestAuthor']),
+            reverse('posts:post_detail', args=[self.test_post.pk]),
+            reverse('posts:follow_index'),
+        ):
+            with self.subTest(url=url):
+                queries = self.get_queries(url)
+                self.assertEqual(queries['default'], 0)
+                self.assertGreater(queries['replica'], 0)
+
+    def test_other_views_use_primary(self):
+        queries = self.get_queries(reverse('posts:post_create'))
+        self.assertEqual(queries['replica'], 0)
+
+    def test_write_pins_client_to_primary(self):
+        """После записи клиент читает свои изменения с основной базы."""
+        for write in (
+            lambda: self.client.post(
+                reverse('posts:add_comment', args=[self.test_post.pk]),
+                {'text': 'Комментарий'},
+            ),
+            lambda: self.client.get(
+                reverse('posts:profile_follow', args=['OtherAuthor'])
+            ),
+        ):
+            self.client.cookies.pop(settings.REPLICA_PIN_COOKIE, None)
+            response = write()
+            self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+            queries = self.get_queries(
+                reverse('posts:post_detail', args=[self.test_post.pk])
+            )
+            self.assertEqual(queries['replica'], 0)
+
+    def test_pin_expires(self):
+        self.client.cookies[settings.REPLICA_PIN_COOKIE] = '0'
+        queries = self.get_queries(reverse('posts:posts'))
+        self.assertEqual(queries['default'], 0)
+
+    def test_pinned_client_bypasses_page_cache(self):
+        """Клиент после записи не получает копию, собранную до неё."""
+        url = reverse('posts:posts')
+        with self.settings(REPLICA_PIN_SECONDS=0):
+            self.client.get(url)
+            self.assertEqual(self.client.get(url)[CACHE_HEADER], 'hit')
+        self.client.cookies[settings.REPLICA_PIN_COOKIE] = str(
+            time.time() + 60
+        )
+        queries = self.get_queries(url)
+        self.assertEqual(queries['replica'], 0)
+        self.assertEqual(self.client.get(url)[CACHE_HEADER], 'miss')
+
+    @override_settings(REPLICA_PIN_SECONDS=60)
+    def test_replica_page_not_cached_while_changes_may_lag(self):
+        """Страница с реплики не сохраняется под свежими версиями."""
+        url = reverse('posts:posts')
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)[CACHE_HEADER], 'miss')
+        with self.settings(REPLICA_PIN_SECONDS=0):
+            self.client.get(url)
+        self.assertEqual(self.client.get(url)[CACHE_HEADER], 'hit')
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template.base import Template
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache_backends import SEQUENCE_KEY
+from core.middleware import RequestStats
+from posts.models import Post, User
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True)
+class QueryBudgetMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create(username='TestAuthor')
+        cls.test_post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.test_author,
+        )
+
+    def test_server_timing_header(self):
+        """Ответ содержит заголовок Server-Timing с числом запросов."""
+        with self.assertLogs('core.query_budget', 'INFO'):
+            response = Client().get(reverse('posts:posts'))
+        self.assertIn('Server-Timing', response)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="')
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+
+    def test_log_line_and_report(self):
+        """Строка лога содержит метрики view, отчёт их агрегирует."""
+        with self.assertLogs('core.query_budget', 'INFO') as logs:
+            Client().get(reverse(
+                'posts:post_detail',
+                kwargs={'post_id': self.test_post.pk}
+            ))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:post_detail')
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreater(
+            record['cache']['l1_misses'] + record['cache']['l1_hits'], 0
+        )
+        with tempfile.NamedTemporaryFile('w', delete=False) as log:
+            log.write(logs.records[0].getMessage() + '\n')
+        out = StringIO()
+        try:
+            call_command('query_report', log.name, stdout=out)
+        finally:
+            os.remove(log.name)
+        self.assertIn('posts:post_detail', out.getvalue())
+
+    def test_template_time_without_patching(self):
+        """Время шаблонов считается и для render(), Template не меняется."""
+        with self.assertLogs('core.query_budget', 'INFO') as logs:
+            Client().get(reverse('posts:search'), {'q': 'текст'})
+        record = json.loads(logs.records[0].getMessage())
+        self.assertGreater(record['template_ms'], 0)
+        self.assertEqual(Template.render.__module__, 'django.template.base')
+
+    @override_settings(QUERY_BUDGET_ENABLED=False)
+    def test_disabled_by_default(self):
+        """Без настройки middleware не подключается."""
+        response = Client().get(reverse('posts:posts'))
+        self.assertNotIn('Server-Timing', response)
+
+
+class RequestStatsTest(TestCase):
+    def test_duplicates_are_grouped_by_sql(self):
+        """Повторяющиеся запросы группируются по тексту SQL."""
+        stats = RequestStats()
+        for params in ((1,), (2,), (3,)):
+            stats(lambda *args: None, 'SELECT %s', params, False, {})
+        stats(lambda *args: None, 'SELECT 1', (), False, {})
+        self.assertEqual(
+            stats.duplicates(), [{'sql': 'SELECT %s', 'count': 3}]
+        )
+
+
+class CacheBatchMiddlewareTest(TestCase):
+    def test_one_journal_record_per_request(self):
+        """Холодная отрисовка главной пишет в журнал один раз."""
+        Post.objects.create(
+            text='Тестовый текст',
+            author=User.objects.create(username='TestAuthor'),
+        )
+        cache.clear()
+        sequence = cache.l2.get(SEQUENCE_KEY)
+        response = Client().get(reverse('posts:posts'))
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertEqual(cache.l2.get(SEQUENCE_KEY), sequence + 1)
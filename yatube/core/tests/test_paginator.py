@@ -0,0 +1,56 @@
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from core.paginator import EstimatedCountPaginator, page_window
+from posts.models import Post, User
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create(username='TestAuthor')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {index}', author=cls.test_author)
+            for index in range(5)
+        )
+
+    def test_exact_count_without_statistics(self):
+        """Без статистики СУБД считается обычный COUNT(*)."""
+        paginator = EstimatedCountPaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.count, 5)
+
+    def test_estimate_from_statistics(self):
+        """После ANALYZE общее количество берётся из статистики."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.create(text='Ещё пост', author=self.test_author)
+        with self.assertNumQueries(2):
+            paginator = EstimatedCountPaginator(Post.objects.all(), 2)
+            self.assertEqual(paginator.count, 5)
+        filtered = EstimatedCountPaginator(
+            Post.objects.filter(author=self.test_author), 2
+        )
+        self.assertEqual(filtered.count, 6)
+
+
+class PageWindowTest(SimpleTestCase):
+    def test_all_pages_when_few(self):
+        self.assertEqual(page_window(3, 7), (1, 2, 3, 4, 5, 6, 7))
+
+    def test_window_around_current_page(self):
+        """Края, соседи текущей страницы и пропуски между ними."""
+        self.assertEqual(
+            page_window(50, 100_000),
+            (1, None, 48, 49, 50, 51, 52, None, 100_000),
+        )
+        self.assertEqual(page_window(1, 100), (1, 2, 3, None, 100))
+        self.assertEqual(page_window(100, 100), (1, None, 98, 99, 100))
+
+    def test_gap_never_hides_one_page(self):
+        self.assertEqual(
+            page_window(5, 100), (1, 2, 3, 4, 5, 6, 7, None, 100)
+        )
+        self.assertEqual(
+            page_window(96, 100), (1, None, 94, 95, 96, 97, 98, 99, 100)
+        )
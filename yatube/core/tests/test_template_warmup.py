@@ -0,0 +1,36 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.template import engines
+from django.test import SimpleTestCase
+
+from core.template_warmup import project_template_names, warm_templates
+
+
+class TemplateWarmupTest(SimpleTestCase):
+    def setUp(self):
+        self.loader = engines['django'].engine.template_loaders[0]
+        self.loader.reset()
+
+    def test_production_loader_is_cached(self):
+        self.assertEqual(
+            type(self.loader).__module__, 'django.template.loaders.cached'
+        )
+
+    def test_project_templates_only(self):
+        names = project_template_names()
+        for name in ('base.html', 'includes/post_card.html',
+                     'posts/includes/paginator.html', 'about/author.html'):
+            with self.subTest(name=name):
+                self.assertIn(name, names)
+        self.assertNotIn('admin/base.html', names)
+
+    def test_warm_templates_fills_loader_cache(self):
+        """После прогрева шаблоны берутся из кэша загрузчика."""
+        names = warm_templates()
+        for name in names:
+            with self.subTest(name=name):
+                self.assertIn(name, self.loader.get_template_cache)
+        out = StringIO()
+        call_command('warm_templates', stdout=out)
+        self.assertIn(str(len(names)), out.getvalue())
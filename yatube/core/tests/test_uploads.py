@@ -0,0 +1,235 @@
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import zlib
+from io import BytesIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.uploads import CappedUploadHandler
+from posts.forms import PostForm
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+# Замеряет прирост пикового RSS (VmHWM, КиБ) дочернего процесса
+# при обработке файла: `pipeline` — через форму поста, `naive` —
+# полным декодированием. ru_maxrss не подходит: он наследуется
+# от родителя через fork и exec.
+MEMORY_SCRIPT = '''
+import os, re, sys
+import django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+django.setup()
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+from posts.forms import PostForm
+
+
+class PathUpload(UploadedFile):
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def peak_rss():
+    with open('/proc/self/status') as status:
+        return int(re.search(r'VmHWM:\\s+(\\d+)', status.read()).group(1))
+
+
+mode, path = sys.argv[1:]
+Image.init()
+before = peak_rss()
+if mode == 'pipeline':
+    upload = PathUpload(
+        open(path, 'rb'), 'big.jpg', 'image/jpeg', os.path.getsize(path)
+    )
+    assert PostForm({'text': 'Пост'}, {'image': upload}).is_valid()
+else:
+    Image.open(path).load()
+print(peak_rss() - before)
+'''
+
+
+def image_file(size, image_format='JPEG', **save_options) -> bytes:
+    buffer = BytesIO()
+    Image.new('RGB', size, 'skyblue').save(
+        buffer, image_format, **save_options
+    )
+    return buffer.getvalue()
+
+
+def png_header(width: int, height: int) -> bytes:
+    """PNG только с заголовком: размеры есть, пикселей нет."""
+    def chunk(kind, data):
+        return (
+            struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data))
+        )
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (
+        b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+        + chunk(b'IDAT', zlib.compress(b'')) + chunk(b'IEND', b'')
+    )
+
+
+class PostFormImageTest(TestCase):
+    def clean(self, content, name='image.jpg'):
+        form = PostForm(
+            {'text': 'Пост с картинкой'},
+            {'image': SimpleUploadedFile(name, content)},
+        )
+        if not form.is_valid():
+            raise ValidationError(form.errors['image'])
+        return form.cleaned_data['image']
+
+    def test_exif_orientation_applied_and_metadata_stripped(self):
+        """Картинка поворачивается по EXIF, а метаданные удаляются."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = 'Camera maker'
+        upload = self.clean(image_file((40, 20), exif=exif.tobytes()))
+        image = Image.open(upload)
+        self.assertEqual(image.size, (20, 40))
+        self.assertEqual(dict(image.getexif()), {})
+        self.assertEqual(upload.name, 'image.jpg')
+
+    def test_downscaled_to_max_side(self):
+        """Длинная сторона уменьшается до IMAGE_MAX_SIDE."""
+        upload = self.clean(image_file((3000, 1000), 'PNG'), 'wide.png')
+        image = Image.open(upload)
+        self.assertEqual(image.format, 'PNG')
+        self.assertEqual(image.size, (settings.IMAGE_MAX_SIDE, 683))
+
+    def test_rejects_by_header_dimensions(self):
+        """Слишком большая картинка отклоняется по заголовку."""
+        for width, height in ((7000, 7000), (20000, 20000)):
+            with self.subTest(width=width, height=height):
+                with self.assertRaisesMessage(
+                    ValidationError, 'Картинка больше 40 мегапикселей.'
+                ):
+                    self.clean(png_header(width, height), 'bomb.png')
+
+    def test_rejects_unsupported_format(self):
+        with self.assertRaisesMessage(ValidationError, 'Поддерживаются'):
+            self.clean(image_file((10, 10), 'BMP'), 'image.bmp')
+
+    def test_rejects_animated_gif(self):
+        """Анимацию нельзя пересохранить, такая картинка отклоняется."""
+        buffer = BytesIO()
+        frames = [Image.new('P', (10, 10), color) for color in (1, 2)]
+        frames[0].save(
+            buffer, 'GIF', save_all=True, append_images=frames[1:]
+        )
+        with self.assertRaisesMessage(ValidationError, 'Анимированные'):
+            self.clean(buffer.getvalue(), 'animated.gif')
+
+    def test_static_gif_kept_as_gif(self):
+        upload = self.clean(image_file((10, 10), 'GIF'), 'small.gif')
+        self.assertEqual(Image.open(upload).format, 'GIF')
+
+
+class CappedUploadHandlerTest(TestCase):
+    @override_settings(UPLOAD_MAX_SIZE=10)
+    def test_stops_writing_after_limit(self):
+        """После лимита данные не пишутся, но размер считается целиком."""
+        handler = CappedUploadHandler()
+        handler.new_file('image', 'image.gif', 'image/gif', None)
+        for start in range(0, 30, 6):
+            handler.receive_data_chunk(b'x' * 6, start)
+        upload = handler.file_complete(30)
+        self.assertEqual(upload.size, 30)
+        self.assertEqual(len(upload.read()), 6)
+        upload.close()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
+class PostUploadTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.test_author = User.objects.create(username='TestAuthor')
+        self.client.force_login(self.test_author)
+
+    def create_post(self, content):
+        return self.client.post(reverse('posts:post_create'), data={
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile('photo.jpg', content, 'image/jpeg'),
+        })
+
+    @override_settings(UPLOAD_MAX_SIZE=1024)
+    def test_too_large_upload_rejected(self):
+        """Файл больше лимита не сохраняется, форма сообщает об ошибке."""
+        response = self.create_post(
+            image_file((300, 300), quality=100) + b'\0' * 1024
+        )
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 1,0\xa0КБ.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_rejects_header_dimensions_before_decoding(self):
+        response = self.create_post(png_header(20000, 20000))
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка больше 40 мегапикселей.'
+        )
+
+    def test_saved_image_is_normalized(self):
+        """В хранилище попадает уже уменьшенная картинка."""
+        self.create_post(image_file((4000, 1000)))
+        post = Post.objects.get()
+        self.assertEqual(
+            (post.image.width, post.image.height),
+            (settings.IMAGE_MAX_SIDE, 512),
+        )
+
+
+@skipUnless(os.path.exists('/proc/self/status'), 'нужен Linux /proc')
+class UploadMemoryTest(TestCase):
+    """Пиковая память при загрузке большой JPEG, в отдельном процессе."""
+    size = (6000, 4000)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        fd, cls.path = tempfile.mkstemp(suffix='.jpg')
+        with os.fdopen(fd, 'wb') as output:
+            output.write(image_file(cls.size))
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.path)
+        super().tearDownClass()
+
+    def peak_kib(self, mode: str) -> int:
+        result = subprocess.run(
+            [sys.executable, '-c', MEMORY_SCRIPT, mode, self.path],
+            cwd=settings.BASE_DIR,
+            stdout=subprocess.PIPE,
+            check=True,
+        )
+        return int(result.stdout.decode().split()[-1])
+
+    def test_pipeline_memory(self):
+        """Загрузка декодирует картинку уменьшенной, а не целиком."""
+        naive = self.peak_kib('naive')
+        pipeline = self.peak_kib('pipeline')
+        sys.stderr.write(
+            f'\n{self.size[0]}×{self.size[1]} JPEG: '
+            f'полное декодирование +{naive // 1024} МиБ, '
+            f'загрузка формы +{pipeline // 1024} МиБ\n'
+        )
+        # Декодируется вдвое меньшая по сторонам картинка, остальное —
+        # промежуточный и итоговый буферы уменьшения до IMAGE_MAX_SIDE.
+        self.assertLess(pipeline, naive * 0.6)
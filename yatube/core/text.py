@@ -0,0 +1,42 @@
+"""Готовый HTML текста, который считается при записи, а не при выводе."""
+from django.conf import settings
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+RENDERED_FIELDS = ('text_html', 'excerpt', 'text_truncated')
+
+
+def render_text(text: str) -> dict:
+    """HTML всего текста и анонса; текст экранируется."""
+    excerpt = Truncator(text).chars(settings.EXCERPT_LENGTH)
+    return {
+        'text_html': linebreaks(text, autoescape=True),
+        'excerpt': linebreaks(excerpt, autoescape=True),
+        'text_truncated': len(text) > settings.EXCERPT_LENGTH,
+    }
+
+
+def backfill_rendered_text(model, force: bool = False,
+                           batch_size: int = 1000) -> int:
+    """Заполняет HTML у строк без него, с `force` — у всех.
+
+    Работает и с историческими моделями из миграций.
+    """
+    fields = [
+        field.name for field in model._meta.get_fields()
+        if field.name in RENDERED_FIELDS
+    ]
+    queryset = model._default_manager.order_by('pk').only('pk', 'text')
+    if not force:
+        queryset = queryset.filter(text_html='')
+    updated, last_pk = 0, 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return updated
+        for obj in batch:
+            for field, value in render_text(obj.text).items():
+                setattr(obj, field, value)
+        model._default_manager.bulk_update(batch, fields)
+        updated += len(batch)
+        last_pk = batch[-1].pk
@@ -0,0 +1,143 @@
+"""Загрузка картинок с ограничением по памяти.
+
+Файл всегда пишется во временный файл, и после `UPLOAD_MAX_SIZE`
+байт запись прекращается. Размеры картинки проверяются по заголовку
+до декодирования. Затем картинка декодируется один раз, уже
+уменьшенной (у JPEG — через масштабирование DCT), поворачивается
+по EXIF и пересохраняется без метаданных не больше `IMAGE_MAX_SIDE`
+по длинной стороне.
+"""
+from tempfile import SpooledTemporaryFile
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+EXIF_ORIENTATION: int = 0x0112
+# Что оставить из `Image.info`: профиль цвета и прозрачность GIF.
+KEPT_INFO = ('icc_profile', 'transparency')
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True},
+    'PNG': {'optimize': True},
+    'GIF': {},
+    'WEBP': {'quality': 85},
+}
+
+
+class CappedUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку на диск и отбрасывает всё после лимита.
+
+    Размер файла при этом остаётся настоящим, чтобы форма могла
+    сообщить о превышении.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received <= settings.UPLOAD_MAX_SIZE:
+            self.file.write(raw_data)
+
+
+def fitted_size(size: tuple, max_side: int) -> tuple:
+    """Размер, вписанный в квадрат `max_side` с сохранением пропорций."""
+    width, height = size
+    scale = min(1, max_side / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def normalize_image(upload, image_format: str, max_side: int):
+    """Пересохраняет картинку: поворот по EXIF, уменьшение, без метаданных."""
+    upload.seek(0)
+    image = Image.open(upload)
+    target = fitted_size(image.size, max_side)
+    orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+    info = {key: image.info[key] for key in KEPT_INFO if key in image.info}
+    image.draft(None, target)
+    image.thumbnail(target, Image.LANCZOS)
+    if orientation != 1:
+        image = ImageOps.exif_transpose(image)
+    image.info = info
+    output = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    image.save(output, image_format, **SAVE_OPTIONS[image_format])
+    size = output.tell()
+    output.seek(0)
+    return UploadedFile(
+        output, upload.name, Image.MIME[image_format], size
+    )
+
+
+ERROR_MESSAGES = {
+    'too_large': 'Файл больше %(limit)s.',
+    'too_many_pixels': 'Картинка больше %(limit)s мегапикселей.',
+    'unsupported_format': 'Поддерживаются JPEG, PNG, GIF и WebP.',
+    'animated': 'Анимированные картинки не поддерживаются.',
+    'invalid_image': forms.ImageField.default_error_messages['invalid_image'],
+}
+
+
+def too_many_pixels() -> ValidationError:
+    return ValidationError(
+        ERROR_MESSAGES['too_many_pixels'],
+        code='too_many_pixels',
+        params={'limit': settings.IMAGE_MAX_PIXELS // 1_000_000},
+    )
+
+
+def check_upload(upload) -> None:
+    """Проверки до декодирования: размер файла и размеры по заголовку."""
+    if upload.size > settings.UPLOAD_MAX_SIZE:
+        raise ValidationError(
+            ERROR_MESSAGES['too_large'],
+            code='too_large',
+            params={'limit': filesizeformat(settings.UPLOAD_MAX_SIZE)},
+        )
+    upload.seek(0)
+    try:
+        Image.open(upload)
+    except Image.DecompressionBombError:
+        raise too_many_pixels()
+    except Exception:
+        # Битый файл отклонит само поле картинки.
+        pass
+    finally:
+        upload.seek(0)
+
+
+def bound_image(upload):
+    """Проверяет картинку после verify() и пересохраняет её.
+
+    Анимация не переносится в пересохранённый файл, поэтому
+    анимированные картинки отклоняются явно.
+    """
+    # После verify() у картинки прочитан только заголовок.
+    width, height = upload.image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise too_many_pixels()
+    if upload.image.format not in SAVE_OPTIONS:
+        raise ValidationError(
+            ERROR_MESSAGES['unsupported_format'],
+            code='unsupported_format',
+        )
+    try:
+        upload.seek(0)
+        if getattr(Image.open(upload), 'is_animated', False):
+            raise ValidationError(
+                ERROR_MESSAGES['animated'], code='animated'
+            )
+        return normalize_image(
+            upload, upload.image.format, settings.IMAGE_MAX_SIDE
+        )
+    except (OSError, ValueError) as exc:
+        raise ValidationError(
+            ERROR_MESSAGES['invalid_image'],
+            code='invalid_image',
+        ) from exc
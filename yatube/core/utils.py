@@ -0,0 +1,19 @@
+import math
+from itertools import islice
+
+
+def percentile(values: list, percent: float) -> float:
+    """Перцентиль методом ближайшего ранга."""
+    values = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def chunks(iterable, size: int):
+    """Списки по `size` элементов из любого итерируемого объекта."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
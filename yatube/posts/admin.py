@@ -1,9 +1,11 @@
 from django.contrib import admin
 
+from core.admin import ScalableAdmin
 from .models import Post, Group, Comment, Follow
+from .search import search_filter
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(ScalableAdmin):
     list_display = (
         'pk',
         'title',
@@ -12,10 +14,18 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group',
     )
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     list_editable = ('group',)
-    empty_value_display = '-пусто-'
+    date_hierarchy = 'pub_date'
+
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по полнотекстовому индексу вместо LIKE '%term%'."""
+        if not search_term:
+            return queryset, False
+        return search_filter(queryset, search_term), False
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -25,25 +35,29 @@ class GroupAdmin(admin.ModelAdmin):
         'slug',
         'description',
     )
+    search_fields = ('title', 'slug')
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ScalableAdmin):
     list_display = (
         'post',
         'author',
         'text',
         'pub_date',
     )
-    empty_value_display = '-пусто-'
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('post', 'author')
+    date_hierarchy = 'pub_date'
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(ScalableAdmin):
     list_display = (
         'user',
         'author',
     )
-    empty_value_display = '-пусто-'
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
 
 
 admin.site.register(Post, PostAdmin)
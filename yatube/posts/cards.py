@@ -0,0 +1,64 @@
+"""Кэш отрисованных карточек постов для лент.
+
+Ключ карточки — id поста, его `updated_at`, версии карточек автора
+и группы и набор флагов ленты. Переименование автора или группы
+поднимает их версию в сигналах, правка поста меняет `updated_at`,
+поэтому карточки не нужно удалять явно. Страница ленты собирается
+одним `get_many`; отрисовываются только карточки, которых нет в кэше.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils import translation
+from django.utils.safestring import mark_safe
+
+from core.cache import get_versions
+from .models import Group, User
+
+CARD_KEY = 'post_card:{}'
+CARD_TEMPLATE = 'includes/post_card.html'
+
+
+def card_namespace(model, pk) -> str:
+    """Версия карточек, показывающих автора или группу."""
+    return f'card:{model._meta.label_lower}:{pk}'
+
+
+def card_key(post, flags: str, versions: dict) -> str:
+    raw = '|'.join(map(str, (
+        post.pk,
+        post.updated_at.isoformat(),
+        versions[card_namespace(User, post.author_id)],
+        versions.get(card_namespace(Group, post.group_id), ''),
+        flags,
+        translation.get_language(),
+    )))
+    return CARD_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+
+def render_cards(posts, **flags) -> list:
+    """HTML карточек постов в порядке страницы."""
+    posts = list(posts)
+    if not posts:
+        return []
+    namespaces = set()
+    for post in posts:
+        namespaces.add(card_namespace(User, post.author_id))
+        if post.group_id is not None:
+            namespaces.add(card_namespace(Group, post.group_id))
+    versions = get_versions(namespaces)
+    flag_names = ','.join(sorted(name for name, on in flags.items() if on))
+    keys = [card_key(post, flag_names, versions) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {}
+    template = get_template(CARD_TEMPLATE)
+    for post, key in zip(posts, keys):
+        if key not in cards:
+            missing[key] = cards[key] = template.render(
+                {'post': post, **flags}
+            )
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_TIMEOUT)
+    return [mark_safe(cards[key]) for key in keys]
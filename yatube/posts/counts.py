@@ -0,0 +1,65 @@
+"""Счётчики постов без полного COUNT(*) на каждый запрос.
+
+Счётчики хранятся в кэше, поправляются сигналами при создании и
+удалении постов и живут не дольше `POST_COUNT_TIMEOUT`, поэтому
+расхождение с базой ограничено по времени.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Post
+
+COUNT_KEY = 'post_count:{}'
+
+
+def count_keys(author_id=None, group_id=None) -> list:
+    """Ключи счётчиков, которые затрагивает пост автора в группе."""
+    keys = [COUNT_KEY.format('all')]
+    if author_id is not None:
+        keys.append(COUNT_KEY.format(f'author:{author_id}'))
+    if group_id is not None:
+        keys.append(COUNT_KEY.format(f'group:{group_id}'))
+    return keys
+
+
+def follow_count_key(user_id) -> str:
+    return COUNT_KEY.format(f'follow:{user_id}')
+
+
+def _get_or_count(key: str, queryset) -> int:
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.add(key, count, settings.POST_COUNT_TIMEOUT)
+    return count
+
+
+def post_count(author=None, group=None) -> int:
+    """Количество постов: всего, у автора или в группе."""
+    posts = Post.objects.all()
+    if author is not None:
+        posts = posts.filter(author=author)
+        key = count_keys(author_id=author.pk)[-1]
+    elif group is not None:
+        posts = posts.filter(group=group)
+        key = count_keys(group_id=group.pk)[-1]
+    else:
+        key = count_keys()[0]
+    return _get_or_count(key, posts)
+
+
+def follow_post_count(user) -> int:
+    """Количество постов в ленте подписок пользователя."""
+    return _get_or_count(
+        follow_count_key(user.pk),
+        Post.objects.filter(author__following__user=user),
+    )
+
+
+def change_counts(keys: list, delta: int) -> None:
+    """Поправляет закэшированные счётчики; отсутствующие пропускает."""
+    for key in keys:
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            pass
@@ -1,5 +1,7 @@
 from django import forms
+from django.core.exceptions import ValidationError
 
+from core.uploads import bound_image, check_upload
 from .models import Post, Comment
 
 
@@ -8,6 +10,29 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image',)
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_error = None
+        name = self.add_prefix('image')
+        upload = self.files.get(name)
+        if upload is not None:
+            try:
+                check_upload(upload)
+            except ValidationError as error:
+                # Такой файл не стоит даже пытаться декодировать.
+                self.upload_error = error
+                self.files = self.files.copy()
+                self.files.pop(name)
+
+    def clean_image(self):
+        """Ограничивает и пересохраняет только что загруженную картинку."""
+        if self.upload_error is not None:
+            raise self.upload_error
+        image = self.cleaned_data['image']
+        if getattr(image, 'image', None) is None:
+            return image
+        return bound_image(image)
+
 
 class CommentForm(forms.ModelForm):
     class Meta():
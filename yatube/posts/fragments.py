@@ -0,0 +1,45 @@
+"""Персональные части страниц постов для `{% personal %}`."""
+from django.template.loader import render_to_string
+
+from core.page_cache import personal_fragment
+from .forms import CommentForm
+from .models import Follow
+
+
+@personal_fragment('feed_switcher')
+def feed_switcher(request, **flags) -> str:
+    if not request.user.is_authenticated:
+        return ''
+    return render_to_string(
+        'posts/includes/switcher.html', flags, request=request
+    )
+
+
+@personal_fragment('post_actions')
+def post_actions(request, post_id, author_id) -> str:
+    """Кнопка правки для автора и форма комментария.
+
+    Форма пустая и одна для всех, как `form` в контексте страницы;
+    здесь она создаётся заново, потому что фрагмент заполняется
+    и для страниц из кэша.
+    """
+    if not request.user.is_authenticated:
+        return ''
+    return render_to_string('posts/includes/post_actions.html', {
+        'post_id': post_id,
+        'author_id': author_id,
+        'form': CommentForm(),
+    }, request=request)
+
+
+@personal_fragment('follow_button')
+def follow_button(request, author_id, username) -> str:
+    user = request.user
+    if not user.is_authenticated or user.pk == author_id:
+        return ''
+    return render_to_string('posts/includes/follow_button.html', {
+        'username': username,
+        'following': Follow.objects.filter(
+            user=user, author_id=author_id
+        ).exists(),
+    }, request=request)
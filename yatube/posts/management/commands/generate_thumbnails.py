@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import make_thumbnail
+
+
+class Command(BaseCommand):
+    help = 'Готовит миниатюры для постов с картинкой без миниатюры.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать миниатюры всех постов с картинкой.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        rebuilt = None
+        if options['all']:
+            rebuilt = set()
+        else:
+            posts = posts.filter(thumbnail='')
+        total = 0
+        for post_id in posts.values_list('pk', flat=True).iterator():
+            make_thumbnail(post_id, rebuilt)
+            total += 1
+        self.stdout.write(f'Миниатюр: {total}')
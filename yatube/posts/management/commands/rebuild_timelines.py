@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+from posts.models import AuthorStats, Follow, TimelineEntry
+
+
+class Command(BaseCommand):
+    help = 'Заново раскладывает посты по лентам подписок.'
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.select_related('user', 'author')
+        with transaction.atomic():
+            TimelineEntry.objects.all().delete()
+            limit = settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+            AuthorStats.objects.update(fanned_out=True)
+            AuthorStats.objects.filter(
+                followers_count__gt=limit
+            ).update(fanned_out=False)
+            for follow in follows.iterator():
+                timeline.backfill(follow.user, follow.author)
+        self.stdout.write(
+            f'Записей в лентах: {TimelineEntry.objects.count()}'
+        )
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from core.utils import chunks
+from posts.models import AuthorStats, Follow, Post, User
+
+# Пользователи обрабатываются частями; размер пачек INSERT и UPDATE
+# внутри части Django подбирает сам под лимиты СУБД.
+CHUNK_SIZE: int = 10_000
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов и подписок всех пользователей.'
+
+    def handle(self, *args, **options):
+        posts = self.count_by(Post.objects, 'author')
+        followers = self.count_by(Follow.objects, 'author')
+        following = self.count_by(Follow.objects, 'user')
+        user_ids = User.objects.values_list('pk', flat=True)
+        total = 0
+        with transaction.atomic():
+            existing = set(
+                AuthorStats.objects.values_list('user_id', flat=True)
+            )
+            for chunk in chunks(user_ids.iterator(), CHUNK_SIZE):
+                stats = [
+                    AuthorStats(
+                        user_id=user_id,
+                        posts_count=posts.get(user_id, 0),
+                        followers_count=followers.get(user_id, 0),
+                        following_count=following.get(user_id, 0),
+                    )
+                    for user_id in chunk
+                ]
+                AuthorStats.objects.bulk_update(
+                    [item for item in stats if item.user_id in existing],
+                    ('posts_count', 'followers_count', 'following_count'),
+                )
+                AuthorStats.objects.bulk_create(
+                    [item for item in stats if item.user_id not in existing]
+                )
+                total += len(stats)
+        self.stdout.write(f'Пересчитано пользователей: {total}')
+
+    @staticmethod
+    def count_by(queryset, field: str) -> dict:
+        return dict(
+            queryset.order_by().values_list(field).annotate(Count('pk'))
+        )
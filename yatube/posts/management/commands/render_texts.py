@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.text import backfill_rendered_text
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = 'Заполняет готовый HTML и анонсы постов и комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать все строки, а не только пустые.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            updated = backfill_rendered_text(
+                model, force=options['all'], batch_size=options['batch_size']
+            )
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {updated}'
+            )
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+CREATE_SQL = '''
+    CREATE VIRTUAL TABLE posts_search USING fts5(
+        text, comments, tokenize = 'unicode61 remove_diacritics 2'
+    )
+'''
+FILL_SQL = '''
+    INSERT INTO posts_search (rowid, text, comments)
+    SELECT post.id, post.text, COALESCE((
+        SELECT group_concat(comment.text, char(10))
+        FROM posts_comment AS comment
+        WHERE comment.post_id = post.id
+    ), '')
+    FROM posts_post AS post
+'''
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SQL)
+    schema_editor.execute(FILL_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
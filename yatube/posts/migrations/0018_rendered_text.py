@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:00
+
+from django.db import migrations, models
+
+from core.text import backfill_rendered_text
+
+
+def render_texts(apps, schema_editor):
+    for model_name in ('Post', 'Comment'):
+        backfill_rendered_text(apps.get_model('posts', model_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, verbose_name='анонс'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='HTML текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, verbose_name='анонс'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='HTML текста'),
+        ),
+        migrations.RunPython(render_texts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:03
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_truncated(apps, schema_editor):
+    for model_name in ('Post', 'Comment'):
+        apps.get_model('posts', model_name).objects.exclude(
+            excerpt=F('text_html')
+        ).update(text_truncated=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_rendered_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='text_truncated',
+            field=models.BooleanField(default=False, editable=False, verbose_name='анонс короче текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_truncated',
+            field=models.BooleanField(default=False, editable=False, verbose_name='анонс короче текста'),
+        ),
+        migrations.RunPython(mark_truncated, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:32
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def mark_popular(apps, schema_editor):
+    """Посты популярных авторов уже не раскладывались по лентам.
+
+    Популярность считается по подпискам: счётчики заводятся лениво,
+    и у автора может ещё не быть строки `AuthorStats`.
+    """
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    popular = Follow.objects.values('author_id').annotate(
+        followers=Count('pk')
+    ).filter(followers__gt=settings.TIMELINE_FANOUT_MAX_FOLLOWERS)
+    for row in popular:
+        author_id = row['author_id']
+        AuthorStats.objects.get_or_create(user_id=author_id, defaults={
+            'posts_count': Post.objects.filter(author_id=author_id).count(),
+            'followers_count': row['followers'],
+            'following_count': Follow.objects.filter(
+                user_id=author_id
+            ).count(),
+        })
+        AuthorStats.objects.filter(user_id=author_id).update(
+            fanned_out=False
+        )
+        TimelineEntry.objects.filter(author_id=author_id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_excerpt_truncated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='fanned_out',
+            field=models.BooleanField(default=True, verbose_name='посты раскладываются по лентам'),
+        ),
+        migrations.RunPython(mark_popular, migrations.RunPython.noop),
+    ]
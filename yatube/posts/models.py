@@ -1,8 +1,11 @@
+import json
+
 from django.db import models
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from django.conf import settings
 
-from core.models import PubDateModel
+from core.models import PubDateModel, RenderedTextModel
 
 User = get_user_model()
 
@@ -34,7 +37,13 @@ class Group(models.Model):
         return self.title
 
 
-class Post(PubDateModel):
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для лент: вместо полного текста только анонс."""
+        return self.defer('text', 'text_html')
+
+
+class Post(RenderedTextModel, PubDateModel):
     title = models.CharField(
         max_length=200,
         verbose_name='название поста',
@@ -62,17 +71,63 @@ class Post(PubDateModel):
         upload_to='posts/',
         blank=True
     )
+    thumbnail = models.ImageField(
+        'Миниатюра',
+        upload_to='posts/thumbnails/',
+        blank=True,
+        editable=False,
+    )
+    image_hash = models.CharField(
+        'хэш картинки',
+        max_length=64,
+        blank=True,
+        editable=False,
+        db_index=True,
+    )
+    image_srcset = models.TextField(
+        'варианты картинки',
+        blank=True,
+        editable=False,
+        help_text='JSON: MIME-тип -> srcset',
+    )
+    updated_at = models.DateTimeField(
+        'дата изменения',
+        auto_now=True,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'пост'
         verbose_name_plural = 'посты'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.LENGHT_STR_METHOD]
 
+    @property
+    def image_sources(self) -> list:
+        """Пары (MIME-тип, srcset) для тегов <source>."""
+        try:
+            sources = json.loads(self.image_srcset)
+        except (TypeError, ValueError):
+            return []
+        if not isinstance(sources, dict):
+            return []
+        return list(sources.items())
+
 
-class Comment(PubDateModel):
+class Comment(RenderedTextModel, PubDateModel):
     post = models.ForeignKey(
         Post,
         blank=True,
@@ -95,6 +150,12 @@ class Comment(PubDateModel):
         verbose_name = 'комментарий'
         verbose_name_plural = 'комментарии'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['post', '-pub_date', '-id'],
+                name='comment_post_pub_date',
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -118,3 +179,114 @@ class Follow(models.Model):
                 name='unique_follow'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user',
+            ),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики постов и подписок пользователя."""
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='пользователь',
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='количество постов',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='количество подписчиков',
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='количество подписок',
+    )
+    fanned_out = models.BooleanField(
+        default=True,
+        verbose_name='посты раскладываются по лентам',
+    )
+
+    class Meta:
+        verbose_name = 'статистика автора'
+        verbose_name_plural = 'статистика авторов'
+
+    def __str__(self):
+        return str(self.user)
+
+    @staticmethod
+    def count_for(user) -> dict:
+        """Считает значения счётчиков пользователя по базе."""
+        return {
+            'posts_count': user.posts.count(),
+            'followers_count': user.following.count(),
+            'following_count': user.follower.count(),
+        }
+
+    @classmethod
+    def for_user(cls, user):
+        """Возвращает счётчики, при отсутствии считает их заново."""
+        stats = cls.objects.filter(user=user).first()
+        if stats is None:
+            stats, _ = cls.objects.get_or_create(
+                user=user,
+                defaults=cls.count_for(user),
+            )
+        return stats
+
+    @classmethod
+    def change(cls, user_id, field: str, delta: int) -> None:
+        """Атомарно изменяет счётчик, не опуская его ниже нуля."""
+        stats = cls.objects.filter(user_id=user_id)
+        if delta < 0:
+            stats = stats.filter(**{f'{field}__gte': -delta})
+        stats.update(**{field: F(field) + delta})
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя, разложенный при публикации."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='автор',
+    )
+    pub_date = models.DateTimeField(verbose_name='дата публикации')
+
+    class Meta:
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author',
+            ),
+        ]
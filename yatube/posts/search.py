@@ -0,0 +1,205 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+На SQLite посты индексируются в виртуальной таблице FTS5 `posts_search`:
+текст поста и склеенные тексты его комментариев, `rowid` равен pk
+поста. Индекс обновляется сигналами в той же транзакции, что и пост.
+Результаты сортируются по bm25, а на остальных СУБД поиск сводится
+к `icontains` в порядке публикации.
+"""
+import re
+from functools import partial
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from core.paginator import CursorPaginator, NEXT
+from .models import Comment
+
+SEARCH_TABLE = 'posts_search'
+TERM_RE = re.compile(r'\w+')
+MARK_START, MARK_END = '\x02', '\x03'
+SNIPPET_TOKENS: int = 32
+# Совпадение в тексте поста весит вдвое больше, чем в комментариях.
+SCORE = f'bm25({SEARCH_TABLE}, 2.0, 1.0)'
+REBUILD_SQL = f'''
+    INSERT INTO {SEARCH_TABLE} (rowid, text, comments)
+    SELECT post.id, post.text, COALESCE((
+        SELECT group_concat(comment.text, char(10))
+        FROM posts_comment AS comment
+        WHERE comment.post_id = post.id
+    ), '')
+    FROM posts_post AS post
+'''
+
+
+def fts_enabled(using: str = 'default') -> bool:
+    return connections[using].vendor == 'sqlite'
+
+
+def to_match(query: str) -> str:
+    """Выражение MATCH: все слова запроса, каждое по префиксу."""
+    return ' '.join(f'"{term}"*' for term in TERM_RE.findall(query))
+
+
+def highlight(snippet: str):
+    """Экранирует фрагмент и превращает маркеры FTS5 в <mark>."""
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def index_post(post, created: bool, using: str = 'default') -> None:
+    if not fts_enabled(using):
+        return
+    with connections[using].cursor() as cursor:
+        if not created:
+            cursor.execute(
+                f'UPDATE {SEARCH_TABLE} SET text = %s WHERE rowid = %s',
+                [post.text, post.pk],
+            )
+            if cursor.rowcount:
+                return
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, text, comments) '
+            f'VALUES (%s, %s, %s)',
+            [
+                post.pk,
+                post.text,
+                '' if created else comments_text(post.pk, using),
+            ],
+        )
+
+
+def index_comments(post_id: int, using: str = 'default') -> None:
+    """Переиндексирует комментарии поста."""
+    if not fts_enabled(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {SEARCH_TABLE} SET comments = %s WHERE rowid = %s',
+            [comments_text(post_id, using), post_id],
+        )
+
+
+def unindex_post(post_id: int, using: str = 'default') -> None:
+    if not fts_enabled(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post_id]
+        )
+
+
+def comments_text(post_id: int, using: str = 'default') -> str:
+    return '\n'.join(
+        Comment.objects.using(using).filter(
+            post_id=post_id
+        ).values_list('text', flat=True)
+    )
+
+
+def rebuild_index(using: str = 'default') -> None:
+    """Заполняет индекс заново, например после bulk_create."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(REBUILD_SQL)
+
+
+def search_filter(queryset, query: str):
+    """Оставляет в queryset посты, найденные по запросу."""
+    match = to_match(query)
+    if not match:
+        return queryset.none()
+    if not fts_enabled(queryset.db):
+        return queryset.filter(
+            Q(text__icontains=query) | Q(comments__text__icontains=query)
+        ).distinct()
+    # `pk__in=RawSQL(...)` даёт `IN ((SELECT ...))`, и SQLite
+    # читает это как скалярный подзапрос с одной строкой.
+    quote_name = connections[queryset.db].ops.quote_name
+    pk_column = '.'.join(map(quote_name, (
+        queryset.model._meta.db_table, queryset.model._meta.pk.column
+    )))
+    return queryset.extra(
+        where=[
+            f'{pk_column} IN (SELECT rowid FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s)'
+        ],
+        params=[match],
+    )
+
+
+def search_count(query: str, using: str = 'default') -> int:
+    match = to_match(query)
+    if not match:
+        return 0
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'SELECT count(*) FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s',
+            [match],
+        )
+        return cursor.fetchone()[0]
+
+
+class SearchPaginator(CursorPaginator):
+    """Страницы результатов FTS5 по ключу (bm25, pk).
+
+    Принимает queryset всех постов. У найденных постов появляются
+    атрибуты `rank` и `snippet` — фрагмент текста с подсвеченными
+    совпадениями. Номерные страницы строятся по `search_filter`,
+    в порядке публикации.
+    """
+
+    parse_key = staticmethod(float)
+
+    def __init__(self, posts, *args, query: str, count=None, **kwargs):
+        if count is None:
+            count = partial(search_count, query, posts.db)
+        super().__init__(
+            search_filter(posts, query), *args, count=count, **kwargs
+        )
+        self.posts = posts
+        self.match = to_match(query)
+
+    def position(self, obj) -> tuple:
+        return obj.rank, obj.pk
+
+    def fetch(self, position, direction: str, limit: int) -> list:
+        if not self.match:
+            return []
+        sql = (
+            f'SELECT rowid, {SCORE}, '
+            f'snippet({SEARCH_TABLE}, -1, %s, %s, %s, %s) '
+            f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+        )
+        params = [MARK_START, MARK_END, '…', SNIPPET_TOKENS, self.match]
+        if direction == NEXT:
+            lookup, ordering = '>', 'ASC'
+        else:
+            lookup, ordering = '<', 'DESC'
+        if position is not None:
+            rank, pk = position
+            sql += (
+                f' AND ({SCORE} {lookup} %s'
+                f' OR ({SCORE} = %s AND rowid {lookup} %s))'
+            )
+            params += [rank, rank, pk]
+        sql += f' ORDER BY {SCORE} {ordering}, rowid {ordering} LIMIT %s'
+        params.append(limit)
+        with connections[self.posts.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        posts = self.posts.in_bulk([pk for pk, _, _ in rows])
+        results = []
+        for pk, rank, snippet in rows:
+            post = posts.get(pk)
+            if post is not None:
+                post.rank = rank
+                post.snippet = highlight(snippet)
+                results.append(post)
+        return results
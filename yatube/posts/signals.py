@@ -0,0 +1,151 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.cache import bump_version
+from core.page_cache import model_namespace
+from . import search, timeline
+from .cards import card_namespace
+from .counts import change_counts, count_keys, follow_count_key
+from .models import Post, Group, Comment, Follow, AuthorStats, User
+
+FEED_CACHE_NAMESPACE = 'feed'
+# Поля, которых нет на страницах: вход пользователя обновляет
+# last_login, и общие страницы из-за этого сбрасываться не должны.
+UNRENDERED_FIELDS = frozenset(('last_login',))
+
+
+@receiver((post_save, post_delete), sender=Post)
+@receiver((post_save, post_delete), sender=Comment)
+def invalidate_feed_cache(sender, **kwargs):
+    """Сбрасывает кэш ленты при изменении постов и комментариев."""
+    bump_version(FEED_CACHE_NAMESPACE)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    """Запоминает прежнюю группу поста, чтобы поправить её счётчик."""
+    instance._old_group_id = None
+    if instance.pk is not None:
+        instance._old_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.change(instance.author_id, 'posts_count', 1)
+        keys = count_keys(instance.author_id, instance.group_id)
+        transaction.on_commit(lambda: change_counts(keys, 1))
+    elif instance._old_group_id != instance.group_id:
+        old_keys = count_keys(group_id=instance._old_group_id)[1:]
+        new_keys = count_keys(group_id=instance.group_id)[1:]
+        transaction.on_commit(lambda: change_counts(old_keys, -1))
+        transaction.on_commit(lambda: change_counts(new_keys, 1))
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    AuthorStats.change(instance.author_id, 'posts_count', -1)
+    keys = count_keys(instance.author_id, instance.group_id)
+    transaction.on_commit(lambda: change_counts(keys, -1))
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def reset_follow_count(sender, instance, **kwargs):
+    cache.delete(follow_count_key(instance.user_id))
+
+
+@receiver(post_save, sender=Follow)
+def count_created_follow(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.change(instance.author_id, 'followers_count', 1)
+        AuthorStats.change(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    AuthorStats.change(instance.author_id, 'followers_count', -1)
+    AuthorStats.change(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created and settings.USE_FOLLOW_TIMELINE:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created and settings.USE_FOLLOW_TIMELINE:
+        timeline.backfill(instance.user, instance.author)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    if settings.USE_FOLLOW_TIMELINE:
+        timeline.prune(instance.user, instance.author)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, created, using, **kwargs):
+    search.index_post(instance, created, using)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, using, **kwargs):
+    search.unindex_post(instance.pk, using)
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def index_post_comments(sender, instance, using, **kwargs):
+    search.index_comments(instance.post_id, using)
+
+
+def post_namespaces(post) -> list:
+    """Пространства имён страниц, на которых виден пост."""
+    namespaces = [
+        model_namespace(Post),
+        model_namespace(Post, post.pk),
+        model_namespace(User, post.author_id),
+    ]
+    group_ids = {post.group_id, getattr(post, '_old_group_id', None)}
+    namespaces.extend(
+        model_namespace(Group, group_id)
+        for group_id in group_ids - {None}
+    )
+    return namespaces
+
+
+@receiver((post_save, post_delete), sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    bump_version(*post_namespaces(instance))
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    bump_version(model_namespace(Post, instance.post_id))
+
+
+@receiver((post_save, post_delete), sender=Group)
+@receiver((post_save, post_delete), sender=User)
+def invalidate_object_pages(sender, instance, update_fields=None, **kwargs):
+    """Имена авторов и групп есть и в кэше ленты на главной."""
+    if update_fields and update_fields <= UNRENDERED_FIELDS:
+        return
+    bump_version(
+        FEED_CACHE_NAMESPACE,
+        model_namespace(sender, instance.pk),
+        card_namespace(sender, instance.pk),
+    )
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    bump_version(
+        model_namespace(User, instance.user_id),
+        model_namespace(User, instance.author_id),
+    )
@@ -0,0 +1,17 @@
+from django import template
+
+from posts.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, **flags):
+    """Карточки постов страницы из кэша.
+
+    Использование::
+
+        {% post_cards page_obj index=True as cards %}
+        {% for card in cards %}{{ card }}{% endfor %}
+    """
+    return render_cards(posts, **flags)
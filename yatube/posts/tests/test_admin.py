@@ -0,0 +1,60 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class AdminChangelistQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        cls.test_group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-group',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_rows(self, amount):
+        start = User.objects.count()
+        for index in range(start, start + amount):
+            author = User.objects.create(username=f'author_{index}')
+            post = Post.objects.create(
+                text=f'Тестовый текст {index}',
+                author=author,
+                group=self.test_group,
+            )
+            Comment.objects.create(post=post, author=author, text='Коммент')
+            Follow.objects.create(user=author, author=self.admin)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """Число запросов списка не зависит от числа строк на странице."""
+        for name in ('post', 'comment', 'follow'):
+            url = reverse(f'admin:posts_{name}_changelist')
+            with self.subTest(model=name):
+                self.add_rows(2)
+                few = self.count_queries(url)
+                self.add_rows(10)
+                self.assertEqual(self.count_queries(url), few)
+
+    def test_list_editable_group_is_autocomplete(self):
+        """Группа в списке выбирается автодополнением, без всех групп."""
+        self.add_rows(1)
+        Group.objects.create(title='Другая группа', slug='other')
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertContains(response, self.test_group.title)
+        self.assertNotContains(response, 'Другая группа')
@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts.counts import count_keys, post_count
+from posts.models import Post, User, Group
+
+
+class PostCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create(username='TestAuthor')
+        cls.test_group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-group',
+            description='Тестовое описание',
+        )
+        Post.objects.create(
+            text='Тестовый текст',
+            author=cls.test_author,
+            group=cls.test_group,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached(self):
+        """Повторный подсчёт не обращается к базе."""
+        with self.assertNumQueries(1):
+            self.assertEqual(post_count(), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(post_count(), 1)
+
+    def test_paginator_uses_cached_count(self):
+        """Номерной пагинатор берёт общее количество из счётчика."""
+        cache.set(count_keys()[0], 25)
+        response = self.client.get(reverse('posts:posts'), {'page': 1})
+        self.assertEqual(response.context['page_obj'].paginator.count, 25)
+        self.assertEqual(
+            response.context['page_obj'].paginator.num_pages, 3
+        )
+
+
+class PostCountSignalsTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.test_author = User.objects.create(username='TestAuthor')
+        self.test_group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-group',
+            description='Тестовое описание',
+        )
+
+    def test_counts_follow_create_edit_and_delete(self):
+        """Счётчики меняются вместе с постами без пересчёта."""
+        post_count()
+        post_count(author=self.test_author)
+        post_count(group=self.test_group)
+        post = Post.objects.create(
+            text='Тестовый текст',
+            author=self.test_author,
+            group=self.test_group,
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(post_count(), 1)
+            self.assertEqual(post_count(author=self.test_author), 1)
+            self.assertEqual(post_count(group=self.test_group), 1)
+        post.group = None
+        post.save()
+        self.assertEqual(post_count(group=self.test_group), 0)
+        post.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(post_count(), 0)
+            self.assertEqual(post_count(author=self.test_author), 0)
@@ -1,12 +1,21 @@
 import shutil
 import tempfile
+from io import StringIO
+from unittest import mock
 
-from django.test import Client, TestCase, override_settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import Client, TestCase, TransactionTestCase
+from django.test import override_settings
 from django.urls import reverse
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+from posts import thumbnails
 from posts.models import Post, Group, User, Comment
+from posts.thumbnails import make_thumbnail
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -340,3 +349,127 @@ class TaskCreateComments(TestCase):
         self.assertRedirects(response, reverse('users:login')
                              + f'?next={next_adress}')
         self.assertEqual(Comment.objects.count(), comments_count)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_WORKERS=0)
+class ThumbnailTests(TransactionTestCase):
+    small_gif = (
+        b'\x47\x49\x46\x38\x39\x61\x02\x00'
+        b'\x01\x00\x80\x00\x00\x00\x00\x00'
+        b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+        b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+        b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+        b'\x0A\x00\x3B'
+    )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.test_author = User.objects.create(username='TestAuthor')
+        self.authorized_author = Client()
+        self.authorized_author.force_login(self.test_author)
+
+    def test_thumbnail_generated_after_create(self):
+        """Миниатюра готовится после сохранения поста с картинкой."""
+        self.authorized_author.get(reverse('posts:posts'))
+        self.authorized_author.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile(
+                    name='small.gif',
+                    content=self.small_gif,
+                    content_type='image/gif'
+                ),
+            },
+        )
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertTrue(post.thumbnail.name.endswith(
+            f'{post.image_hash}_960.jpg'
+        ))
+        self.assertEqual(post.thumbnail.width, 960)
+        response = self.authorized_author.get(reverse('posts:posts'))
+        self.assertContains(response, post.thumbnail.url)
+        for mime, srcset in post.image_sources:
+            with self.subTest(mime=mime):
+                self.assertIn('480w', srcset)
+                self.assertIn('960w', srcset)
+                self.assertNotIn('1440w', srcset)
+                self.assertContains(response, f'type="{mime}"')
+
+    def test_same_image_processed_once(self):
+        """Одинаковые картинки разных постов делят одни варианты."""
+        posts = [
+            Post.objects.create(
+                text=f'Пост {index}',
+                author=self.test_author,
+                image=SimpleUploadedFile(
+                    name='small.gif',
+                    content=self.small_gif,
+                    content_type='image/gif'
+                ),
+            )
+            for index in range(2)
+        ]
+        make_thumbnail(posts[0].pk)
+        with mock.patch('posts.thumbnails.build_variants') as build:
+            make_thumbnail(posts[1].pk)
+        build.assert_not_called()
+        first, second = Post.objects.filter(
+            pk__in=[post.pk for post in posts]
+        )
+        self.assertNotEqual(first.image.name, second.image.name)
+        self.assertEqual(first.thumbnail.name, second.thumbnail.name)
+        self.assertEqual(first.image_srcset, second.image_srcset)
+
+    def test_generate_all_rebuilds_variants(self):
+        """--all пересоздаёт файлы, даже если они уже есть."""
+        posts = [
+            Post.objects.create(
+                text=f'Пост {index}',
+                author=self.test_author,
+                image=SimpleUploadedFile(
+                    name='small.gif',
+                    content=self.small_gif,
+                    content_type='image/gif'
+                ),
+            )
+            for index in range(2)
+        ]
+        make_thumbnail(posts[0].pk)
+        make_thumbnail(posts[1].pk)
+        name = Post.objects.get(pk=posts[0].pk).thumbnail.name
+        default_storage.delete(name)
+        default_storage.save(name, ContentFile(b'stale'))
+        with mock.patch(
+            'posts.thumbnails.build_variants',
+            wraps=thumbnails.build_variants,
+        ) as build:
+            call_command('generate_thumbnails', '--all', stdout=StringIO())
+        build.assert_called_once()
+        with default_storage.open(name) as thumbnail:
+            self.assertNotEqual(thumbnail.read(), b'stale')
+        self.assertEqual(
+            Post.objects.filter(thumbnail=name).count(), 2
+        )
+
+    def test_placeholder_while_thumbnail_pending(self):
+        """Пока миниатюры нет, вместо картинки выводится заглушка."""
+        post = Post.objects.create(
+            text='Пост с картинкой',
+            author=self.test_author,
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=self.small_gif,
+                content_type='image/gif'
+            ),
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, 'aspect-ratio: 960 / 339')
+        self.assertNotContains(response, '<img class="card-img')
@@ -1,8 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.conf import settings
 
-from ..models import Group, Post
+from ..models import AuthorStats, Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -23,6 +26,15 @@ class PostModelTest(TestCase):
         expected_models_str = post.text[:settings.LENGHT_STR_METHOD]
         self.assertEqual(expected_models_str, str(post))
 
+    def test_image_sources_ignore_broken_srcset(self):
+        """Битый srcset не ломает вывод поста."""
+        post = Post(image_srcset='{"image/webp": "a.webp 480w"}')
+        self.assertEqual(post.image_sources, [('image/webp', 'a.webp 480w')])
+        for srcset in ('', 'not json', '[1, 2]', 'null'):
+            with self.subTest(srcset=srcset):
+                post.image_srcset = srcset
+                self.assertEqual(post.image_sources, [])
+
     def test_verbose_name(self):
         post = PostModelTest.post
         field_verboses = {
@@ -98,3 +110,86 @@ class GroupModelTest(TestCase):
                 self.assertEqual(
                     group._meta.get_field(field).help_text, expected_value
                 )
+
+
+class AuthorStatsModelTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        Post.objects.create(author=cls.author, text='Тестовая пост')
+
+    def test_stats_are_counted_on_first_access(self):
+        """Отсутствующие счётчики считаются по базе."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        stats = AuthorStats.for_user(self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(stats.following_count, 0)
+
+    def test_stats_follow_posts_and_subscriptions(self):
+        """Счётчики меняются при создании постов и подписок."""
+        AuthorStats.for_user(self.author)
+        AuthorStats.for_user(self.follower)
+        Post.objects.create(author=self.author, text='Ещё пост')
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        self.assertEqual(AuthorStats.for_user(self.author).posts_count, 2)
+        self.assertEqual(
+            AuthorStats.for_user(self.author).followers_count, 1
+        )
+        self.assertEqual(
+            AuthorStats.for_user(self.follower).following_count, 1
+        )
+        follow.delete()
+        self.assertEqual(
+            AuthorStats.for_user(self.author).followers_count, 0
+        )
+        self.assertEqual(
+            AuthorStats.for_user(self.follower).following_count, 0
+        )
+
+    def test_recount_stats_repairs_drift(self):
+        """Команда recount_stats исправляет разошедшиеся счётчики."""
+        AuthorStats.for_user(self.author)
+        AuthorStats.objects.filter(user=self.author).update(posts_count=42)
+        call_command('recount_stats', stdout=StringIO())
+        self.assertEqual(AuthorStats.for_user(self.author).posts_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.count(), User.objects.count()
+        )
+
+
+@override_settings(EXCERPT_LENGTH=10)
+class RenderedTextTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+
+    def test_text_rendered_on_save(self):
+        """HTML и анонс считаются при сохранении, текст экранируется."""
+        post = Post.objects.create(
+            author=self.author, text='<b>Первая</b>\n\nвторая строка'
+        )
+        self.assertEqual(
+            post.text_html,
+            '<p>&lt;b&gt;Первая&lt;/b&gt;</p>\n\n<p>вторая строка</p>',
+        )
+        self.assertEqual(post.excerpt, '<p>&lt;b&gt;Первая…</p>')
+        post.text = 'Новый текст'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>Новый текст</p>')
+        comment = Comment.objects.create(
+            post=post, author=self.author, text='Комментарий'
+        )
+        self.assertEqual(comment.text_html, '<p>Комментарий</p>')
+
+    def test_render_texts_fills_empty_rows(self):
+        """Команда render_texts заполняет HTML у старых строк."""
+        post = Post.objects.create(author=self.author, text='Текст')
+        Post.objects.filter(pk=post.pk).update(text_html='', excerpt='')
+        call_command('render_texts', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>Текст</p>')
+        self.assertEqual(post.excerpt, '<p>Текст</p>')
@@ -0,0 +1,100 @@
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, TestCase
+from django.test import override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+from posts.search import search_filter
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create(username='TestAuthor')
+        cls.text_post = Post.objects.create(
+            text='Кэширование ленты через версии',
+            author=cls.test_author,
+        )
+        cls.comment_post = Post.objects.create(
+            text='Пост без нужного слова',
+            author=cls.test_author,
+        )
+        Comment.objects.create(
+            post=cls.comment_post,
+            author=cls.test_author,
+            text='А как же кэширование?',
+        )
+        Post.objects.create(text='Совсем другой пост', author=cls.test_author)
+
+    def search(self, query, **params):
+        return self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+
+    def test_finds_posts_by_text_and_comments(self):
+        """Поиск находит посты по тексту и по комментариям."""
+        response = self.search('кэш')
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.text_post, self.comment_post],
+        )
+
+    def test_highlight_is_escaped(self):
+        """Совпадения подсвечиваются, а разметка из текста экранируется."""
+        Post.objects.create(
+            text='<script>alert(1)</script> индекс',
+            author=self.test_author,
+        )
+        response = self.search('индекс')
+        self.assertContains(response, '<mark>индекс</mark>')
+        self.assertContains(response, '&lt;script&gt;')
+        self.assertNotContains(response, '<script>alert')
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при правке и удалении поста и комментария."""
+        self.text_post.text = 'Про индексы'
+        self.text_post.save()
+        self.comment_post.comments.all().delete()
+        self.assertEqual(list(self.search('кэш').context['page_obj']), [])
+        self.assertEqual(
+            list(self.search('индекс').context['page_obj']),
+            [self.text_post],
+        )
+        self.text_post.delete()
+        self.assertEqual(list(self.search('индекс').context['page_obj']), [])
+
+    def test_empty_query(self):
+        """Без запроса выводится только форма."""
+        for query in ('', '  ', '"*'):
+            with self.subTest(query=query):
+                response = self.search(query)
+                self.assertFalse(response.context['page_obj'])
+
+    @override_settings(AMOUNT_POSTS=1)
+    def test_cursor_pages_keep_query(self):
+        """Ссылки на следующую страницу сохраняют запрос."""
+        first_page = self.search('кэш').context['page_obj']
+        self.assertEqual(first_page.paginator.count, 2)
+        self.assertEqual(first_page.query_prefix, '?q=%D0%BA%D1%8D%D1%88&')
+        second_page = self.search(
+            'кэш', cursor=first_page.next_cursor
+        ).context['page_obj']
+        self.assertEqual(list(second_page), [self.comment_post])
+        self.assertIsNone(second_page.next_cursor)
+        previous_page = self.search(
+            'кэш', cursor=second_page.previous_cursor
+        ).context['page_obj']
+        self.assertEqual(list(previous_page), [self.text_post])
+
+    def test_admin_uses_search_index(self):
+        """Поиск в админке идёт через полнотекстовый индекс."""
+        request = RequestFactory().get('/')
+        queryset, use_distinct = site._registry[Post].get_search_results(
+            request, Post.objects.all(), 'кэширование'
+        )
+        self.assertFalse(use_distinct)
+        self.assertEqual(
+            set(queryset), set(search_filter(Post.objects.all(), 'кэш'))
+        )
+        self.assertEqual(queryset.count(), 2)
@@ -1,5 +1,6 @@
 from http import HTTPStatus
 
+from django.core.cache import cache
 from django.test import TestCase, Client
 
 from posts.models import Post, Group, User
@@ -25,6 +26,7 @@ class PostsURLTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.user = User.objects.create_user(username='TestUser')
         self.authorized_client = Client()
@@ -37,6 +39,7 @@ class PostsURLTests(TestCase):
             f'/group/{self.test_group.slug}/': 'posts/group_list.html',
             f'/profile/{self.test_author.username}/': 'posts/profile.html',
             f'/posts/{self.test_post.pk}/': 'posts/post_detail.html',
+            '/search/': 'posts/search.html',
         }
 
         self.urls_dict_authorized_users = {
@@ -46,6 +49,7 @@ class PostsURLTests(TestCase):
             f'/posts/{self.test_post.pk}/': 'posts/post_detail.html',
             '/create/': 'posts/create_post.html',
             '/follow/': 'posts/follow.html',
+            '/search/': 'posts/search.html',
         }
 
     def test_posts_urls_guest_users(self):
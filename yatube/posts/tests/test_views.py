@@ -1,15 +1,19 @@
 import shutil
 import tempfile
 
-from django.test import Client, TestCase, override_settings
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
 from django.urls import reverse
 from django import forms
 from django.shortcuts import get_object_or_404
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
 
-from posts.models import Post, User, Group, Comment, Follow
+from core.cache import LOCK_KEY, get_version
+from posts.models import AuthorStats, Post, User, Group, Comment, Follow
 
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -65,6 +69,7 @@ class PostPagesTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.authorized_author = Client()
         self.authorized_author.force_login(self.test_author)
         self.user = User.objects.create_user(username='TestUser')
@@ -203,17 +208,14 @@ class PostPagesTests(TestCase):
 
     def test_cash_work(self):
         """Проверяем кэширование на главной."""
+        cache.clear()
         response = self.authorized_client.get(reverse('posts:posts'))
         first_object = response.content
-        form_data = {
-            'text': 'Test cache',
-        }
-        self.authorized_client.post(
-            reverse('posts:post_create'),
-            data=form_data,
-            follow=True
+        # update() не отправляет сигналы, поэтому кэш не сбрасывается,
+        # и не вызывает save(), поэтому анонс обновляем сами.
+        Post.objects.filter(pk=self.test_post.pk).update(
+            text='Test cache', excerpt='<p>Test cache</p>'
         )
-        Post.objects.get(text='Test cache').delete()
         response = self.authorized_client.get(reverse('posts:posts'))
         second_object = response.content
         self.assertEqual(first_object, second_object)
@@ -222,6 +224,32 @@ class PostPagesTests(TestCase):
         third_object = new_response.content
         self.assertNotEqual(second_object, third_object)
 
+    def test_cache_invalidated_on_new_post(self):
+        """Новый пост сразу появляется на закэшированной главной."""
+        cache.clear()
+        self.authorized_client.get(reverse('posts:posts'))
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Test cache'},
+            follow=True
+        )
+        response = self.authorized_client.get(reverse('posts:posts'))
+        self.assertContains(response, 'Test cache')
+
+    def test_cache_serves_stale_page_while_rebuilding(self):
+        """Пока кэш перестраивается, остальные получают прошлую версию."""
+        cache.clear()
+        first_object = self.authorized_client.get(
+            reverse('posts:posts')
+        ).content
+        Post.objects.create(text='Test cache', author=self.test_author)
+        key = make_template_fragment_key(
+            'index', [get_version('feed'), None, '']
+        )
+        cache.add(LOCK_KEY.format(key), True)
+        response = self.authorized_client.get(reverse('posts:posts'))
+        self.assertEqual(first_object, response.content)
+
     def test_follow_page_show_correct_context(self):
         """Тест проверяет контекст при просмотре избранных авторов."""
         Follow.objects.create(
@@ -313,6 +341,9 @@ class PaginatorViewsTest(TestCase):
                 )
             )
 
+    def setUp(self):
+        cache.clear()
+
     def test_first_page_index_group_profile(self):
         """Проверка работы первой страницы пагинатора."""
         dict_context_urls = {
@@ -353,3 +384,564 @@ class PaginatorViewsTest(TestCase):
                     len(response.context[context]),
                     (self.AMOUNT_NEW_POSTS - self.POSTS_PER_PAGE)
                 )
+
+    def test_cursor_pages_index_group_profile_follow(self):
+        """Проверка переходов по курсору вперёд и назад."""
+        follower = User.objects.create_user(username='TestFollower')
+        Follow.objects.create(user=follower, author=self.test_author)
+        self.client.force_login(follower)
+        urls = (
+            reverse('posts:posts'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': self.test_group.slug}),
+            reverse(
+                'posts:profile',
+                kwargs={'username': self.test_author.username}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first_page = self.client.get(url).context['page_obj']
+                self.assertIsNone(first_page.previous_cursor)
+                second_page = self.client.get(
+                    url, {'cursor': first_page.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    len(second_page),
+                    self.AMOUNT_NEW_POSTS - self.POSTS_PER_PAGE
+                )
+                self.assertIsNone(second_page.next_cursor)
+                previous_page = self.client.get(
+                    url, {'cursor': second_page.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    list(previous_page), list(first_page)
+                )
+                self.assertIsNone(previous_page.previous_cursor)
+
+    @override_settings(AMOUNT_POSTS=1)
+    def test_numbered_pages_window(self):
+        """Навигация показывает окно страниц, а не все номера."""
+        response = self.client.get(reverse('posts:posts'), {'page': 7})
+        page = response.context['page_obj']
+        self.assertEqual(page.page_window, (1, None, 5, 6, 7, 8, 9, None, 13))
+        self.assertNotContains(response, '?page=2"')
+        self.assertContains(response, '<link rel="prev" href="?page=6" />')
+        self.assertContains(response, '<link rel="next" href="?page=8" />')
+
+    def test_cursor_pages_link_neighbours(self):
+        response = self.client.get(reverse('posts:posts'))
+        page = response.context['page_obj']
+        self.assertContains(
+            response,
+            f'<link rel="next" href="?cursor={page.next_cursor}" />',
+        )
+        self.assertNotContains(response, 'rel="prev"')
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Битый курсор отдаёт первую страницу."""
+        response = self.client.get(
+            reverse('posts:posts'), {'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            self.test_post[::-1][:self.POSTS_PER_PAGE]
+        )
+        self.assertEqual(response.context['page_obj'].cursor, '')
+
+    def test_invalid_cursors_share_first_page_cache(self):
+        """Битые курсоры не заводят новых записей в кэше страниц."""
+        self.client.get(reverse('posts:posts'))
+        response = self.client.get(
+            reverse('posts:posts'), {'cursor': 'another-bad-cursor'}
+        )
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+
+@override_settings(BACKGROUND_WORKERS=0)
+class TimelineViewsTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.test_author = User.objects.create(username='TestAuthor')
+        self.test_post = Post.objects.create(
+            text='Тестовый текст',
+            author=self.test_author,
+        )
+        self.user = User.objects.create_user(username='TestUser')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_timeline_follows_subscriptions(self):
+        """Лента раскладывается при подписке, публикации и отписке."""
+        Follow.objects.create(user=self.user, author=self.test_author)
+        new_post = Post.objects.create(
+            text='Новый пост',
+            author=self.test_author,
+        )
+        self.assertEqual(
+            set(self.user.timeline.values_list('post', flat=True)),
+            {self.test_post.pk, new_post.pk}
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [new_post, self.test_post]
+        )
+        Follow.objects.filter(user=self.user).delete()
+        self.assertFalse(self.user.timeline.exists())
+
+    @override_settings(
+        TIMELINE_FANOUT_MAX_FOLLOWERS=0,
+        TIMELINE_FANOUT_RESUME_FOLLOWERS=0,
+    )
+    def test_popular_author_posts_are_read_on_demand(self):
+        """Посты популярных авторов подмешиваются при чтении ленты."""
+        AuthorStats.for_user(self.test_author)
+        AuthorStats.objects.filter(user=self.test_author).update(
+            fanned_out=False
+        )
+        Follow.objects.create(user=self.user, author=self.test_author)
+        new_post = Post.objects.create(
+            text='Новый пост',
+            author=self.test_author,
+        )
+        self.assertFalse(self.user.timeline.exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [new_post, self.test_post]
+        )
+
+    @override_settings(
+        TIMELINE_FANOUT_MAX_FOLLOWERS=2,
+        TIMELINE_FANOUT_RESUME_FOLLOWERS=1,
+    )
+    def test_threshold_crossing_keeps_posts_in_feed(self):
+        """Посты не пропадают, а способ доставки меняется с запасом."""
+        def feed():
+            response = self.authorized_client.get(
+                reverse('posts:follow_index')
+            )
+            return list(response.context['page_obj'])
+
+        def timeline():
+            return set(self.user.timeline.values_list('post', flat=True))
+
+        first, second = (
+            User.objects.create(username=f'Follower{i}') for i in range(2)
+        )
+        Follow.objects.create(user=self.user, author=self.test_author)
+        Follow.objects.create(user=first, author=self.test_author)
+        self.assertEqual(timeline(), {self.test_post.pk})
+        Follow.objects.create(user=second, author=self.test_author)
+        self.assertFalse(self.user.timeline.exists())
+        new_post = Post.objects.create(
+            text='Новый пост',
+            author=self.test_author,
+        )
+        self.assertEqual(feed(), [new_post, self.test_post])
+        Follow.objects.filter(user=second).delete()
+        self.assertFalse(self.user.timeline.exists())
+        self.assertEqual(feed(), [new_post, self.test_post])
+        Follow.objects.filter(user=first).delete()
+        self.assertEqual(timeline(), {self.test_post.pk, new_post.pk})
+        self.assertEqual(feed(), [new_post, self.test_post])
+        with override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=0):
+            self.assertEqual(feed(), [new_post, self.test_post])
+
+
+class PostDetailQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create(username='TestAuthor')
+        cls.test_group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-group',
+            description='Тестовое описание',
+        )
+        cls.test_post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.test_author,
+            group=cls.test_group,
+        )
+        cls.AMOUNT_COMMENTS: int = 50
+        for i in range(cls.AMOUNT_COMMENTS):
+            Comment.objects.create(
+                post=cls.test_post,
+                author=User.objects.create(username=f'Commentator{i}'),
+                text=f'Комментарий {i}',
+            )
+
+    def test_post_detail_query_budget(self):
+        """Количество запросов не зависит от числа комментариев."""
+        url = reverse(
+            'posts:post_detail',
+            kwargs={'post_id': self.test_post.pk}
+        )
+        self.client.get(url)
+        cache.clear()
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(
+            len(response.context['comments']), settings.AMOUNT_COMMENTS
+        )
+        cache.clear()
+        with self.assertNumQueries(3):
+            self.client.get(
+                url, {'cursor': response.context['comments'].next_cursor}
+            )
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create(username='TestAuthor')
+        cls.other_author = User.objects.create(username='OtherAuthor')
+        cls.test_group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-group',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-group',
+            description='Тестовое описание',
+        )
+        cls.test_post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.test_author,
+            group=cls.test_group,
+        )
+        Post.objects.create(
+            text='Пост другого автора',
+            author=cls.other_author,
+            group=cls.other_group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = {
+            'index': reverse('posts:posts'),
+            'group': reverse('posts:group_list', args=['test-group']),
+            'other_group': reverse('posts:group_list', args=['other-group']),
+            'profile': reverse('posts:profile', args=['TestAuthor']),
+            'other_profile': reverse('posts:profile', args=['OtherAuthor']),
+            'post_detail': reverse('posts:post_detail', args=[
+                self.test_post.pk
+            ]),
+        }
+        for url in self.urls.values():
+            self.client.get(url)
+
+    def cache_status(self) -> dict:
+        return {
+            name: self.client.get(url)['X-Page-Cache']
+            for name, url in self.urls.items()
+        }
+
+    def test_anonymous_hit_without_queries(self):
+        """Повторный анонимный запрос отдаётся из кэша без базы."""
+        for url in self.urls.values():
+            with self.subTest(url=url):
+                with self.assertNumQueries(0):
+                    response = self.client.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'hit')
+                self.assertContains(response, 'tube')
+
+    def test_not_cached(self):
+        """С лишними параметрами кэш не используется."""
+        response = self.client.get(self.urls['index'], {'utm': 'mail'})
+        self.assertNotIn('X-Page-Cache', response)
+
+    def test_authorized_hit_with_personal_parts(self):
+        """Авторизованные получают общую копию со своими частями."""
+        self.client.force_login(self.other_author)
+        for name, url in self.urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'hit')
+                self.assertContains(response, 'Пользователь: OtherAuthor')
+                self.assertNotContains(response, '<!--personal:')
+                self.assertNotContains(response, 'Войти')
+        response = self.client.get(self.urls['profile'])
+        self.assertContains(response, 'Подписаться')
+        response = self.client.get(self.urls['other_profile'])
+        self.assertNotContains(response, 'Подписаться')
+        response = self.client.get(self.urls['post_detail'])
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertNotContains(response, 'редактировать запись')
+        self.client.force_login(self.test_author)
+        response = self.client.get(self.urls['post_detail'])
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Пользователь: TestAuthor')
+        self.assertContains(response, 'редактировать запись')
+
+    def test_cached_page_accepts_comment(self):
+        """CSRF-токен из закэшированной страницы действителен."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.other_author)
+        response = client.get(self.urls['post_detail'])
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        token = response.context['csrf_token']
+        response = client.post(
+            reverse('posts:add_comment', args=[self.test_post.pk]),
+            {'text': 'Комментарий', 'csrfmiddlewaretoken': str(token)},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            Comment.objects.filter(author=self.other_author).exists()
+        )
+
+    def test_follow_button_not_cached(self):
+        """Кнопка подписки меняется без сброса кэша страницы."""
+        self.client.force_login(self.other_author)
+        Follow.objects.create(user=self.other_author, author=self.test_author)
+        self.client.get(self.urls['profile'])
+        response = self.client.get(self.urls['profile'])
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Отписаться')
+
+    def test_new_post_invalidates_affected_pages(self):
+        """Новый пост сбрасывает ленту, свою группу и профиль автора."""
+        Post.objects.create(
+            text='Новый пост',
+            author=self.test_author,
+            group=self.test_group,
+        )
+        self.assertEqual(self.cache_status(), {
+            'index': 'miss',
+            'group': 'miss',
+            'other_group': 'hit',
+            'profile': 'miss',
+            'other_profile': 'hit',
+            'post_detail': 'miss',
+        })
+
+    def test_comment_invalidates_post_detail(self):
+        Comment.objects.create(
+            post=self.test_post,
+            author=self.other_author,
+            text='Комментарий',
+        )
+        self.assertEqual(self.cache_status(), {
+            'index': 'hit',
+            'group': 'hit',
+            'other_group': 'hit',
+            'profile': 'hit',
+            'other_profile': 'hit',
+            'post_detail': 'miss',
+        })
+
+    def test_user_and_follow_invalidate_profiles(self):
+        """Правка пользователя и подписка сбрасывают страницы с ним."""
+        self.other_author.first_name = 'Другой'
+        self.other_author.save()
+        self.assertEqual(self.cache_status(), {
+            'index': 'miss',
+            'group': 'hit',
+            'other_group': 'miss',
+            'profile': 'hit',
+            'other_profile': 'miss',
+            'post_detail': 'hit',
+        })
+        Follow.objects.create(user=self.other_author, author=self.test_author)
+        self.assertEqual(self.client.get(self.urls['profile'])[
+            'X-Page-Cache'
+        ], 'miss')
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create(username='TestAuthor')
+        cls.test_group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-group',
+            description='Тестовое описание',
+        )
+        cls.test_post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.test_author,
+            group=cls.test_group,
+        )
+        cls.urls = (
+            reverse('posts:posts'),
+            reverse('posts:group_list', args=['test-group']),
+            reverse('posts:profile', args=['TestAuthor']),
+            reverse('posts:post_detail', args=[cls.test_post.pk]),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.test_author)
+
+    def test_not_modified_without_rendering(self):
+        """Совпавший ETag даёт 304 без отрисовки шаблона."""
+        for client in (self.client, self.authorized_client):
+            for url in self.urls:
+                with self.subTest(url=url):
+                    etag = client.get(url)['ETag']
+                    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 304)
+                    self.assertEqual(response.templates, [])
+                    self.assertEqual(response['ETag'], etag)
+
+    def test_not_modified_since(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                last_modified = self.client.get(url)['Last-Modified']
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_after_write(self):
+        """После изменения зависимостей страница отдаётся заново."""
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        Comment.objects.create(
+            post=self.test_post,
+            author=self.test_author,
+            text='Комментарий',
+        )
+        Post.objects.create(
+            text='Новый пост',
+            author=self.test_author,
+            group=self.test_group,
+        )
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_user(self):
+        """Страница гостя и пользователя различаются по ETag."""
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create(username='TestAuthor')
+        cls.test_group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-group',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Тестовый текст {number}',
+                author=cls.test_author,
+                group=cls.test_group,
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.test_author)
+        self.url = reverse('posts:profile', args=['TestAuthor'])
+
+    def rendered_cards(self, url=None) -> int:
+        response = self.client.get(url or self.url)
+        return [t.name for t in response.templates].count(
+            'includes/post_card.html'
+        )
+
+    def test_cards_rendered_once(self):
+        """Повторная страница собирается из кэша карточек."""
+        self.assertEqual(self.rendered_cards(), 3)
+        self.assertEqual(self.rendered_cards(), 0)
+        group_url = reverse('posts:group_list', args=['test-group'])
+        self.assertEqual(self.rendered_cards(group_url), 3)
+
+    def test_post_edit_rerenders_card(self):
+        self.rendered_cards()
+        post = self.posts[0]
+        post.text = 'Изменённый текст'
+        post.save()
+        self.assertEqual(self.rendered_cards(), 1)
+        self.assertContains(self.client.get(self.url), 'Изменённый текст')
+
+    def test_author_and_group_rename_rerender_cards(self):
+        group_url = reverse('posts:group_list', args=['test-group'])
+        index_url = reverse('posts:posts')
+        self.rendered_cards(group_url)
+        self.rendered_cards(index_url)
+        self.test_author.first_name = 'Новое'
+        self.test_author.save()
+        self.assertEqual(self.rendered_cards(group_url), 3)
+        self.assertContains(self.client.get(index_url), 'Новое')
+        self.rendered_cards()
+        self.test_group.slug = 'new-slug'
+        self.test_group.save()
+        self.assertEqual(self.rendered_cards(), 3)
+        self.assertContains(self.client.get(self.url), '/group/new-slug/')
+        self.assertContains(self.client.get(index_url), '/group/new-slug/')
+
+
+@override_settings(EXCERPT_LENGTH=20)
+class ExcerptFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create(username='TestAuthor')
+        cls.test_group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-group',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(
+            user=User.objects.create(username='Reader'),
+            author=cls.test_author,
+        )
+        cls.short_post = Post.objects.create(
+            text='Короткий пост',
+            author=cls.test_author,
+            group=cls.test_group,
+        )
+        cls.long_post = Post.objects.create(
+            text='Начало длинного поста ' + 'слово ' * 100 + 'конец',
+            author=cls.test_author,
+            group=cls.test_group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.get(username='Reader'))
+
+    def test_feeds_load_only_excerpts(self):
+        """Ленты не читают полный текст и ведут на страницу поста."""
+        detail_url = reverse('posts:post_detail', args=[self.long_post.pk])
+        for url in (
+            reverse('posts:posts'),
+            reverse('posts:group_list', args=['test-group']),
+            reverse('posts:profile', args=['TestAuthor']),
+            reverse('posts:follow_index'),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                for post in response.context['page_obj']:
+                    self.assertLessEqual(
+                        {'text', 'text_html'}, post.get_deferred_fields()
+                    )
+                self.assertNotContains(response, 'конец')
+                self.assertContains(
+                    response, f'href="{detail_url}">читать дальше', count=1
+                )
+
+    def test_detail_shows_full_text(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.long_post.pk])
+        )
+        self.assertContains(response, 'конец')
+        self.assertNotContains(response, 'читать дальше')
@@ -0,0 +1,134 @@
+"""Миниатюры картинок постов, которые готовятся вне запроса.
+
+Для каждой картинки готовится JPEG-миниатюра 960x339 и набор
+вариантов разной ширины в современных форматах (WebP и AVIF, если
+его поддерживает Pillow) для `srcset`. Файлы называются по хэшу
+содержимого, поэтому одна и та же картинка в разных постах
+обрабатывается и хранится один раз.
+"""
+import hashlib
+import json
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from core.cache import bump_version
+from core.tasks import run_in_background
+from .models import Post
+from .signals import FEED_CACHE_NAMESPACE, post_namespaces
+
+THUMBNAIL_SIZE = (960, 339)
+THUMBNAIL_QUALITY: int = 85
+VARIANT_WIDTHS = (480, 960, 1440)
+VARIANT_FORMATS = tuple(
+    (mime, pil_format, extension)
+    for mime, pil_format, extension, feature in (
+        ('image/avif', 'AVIF', 'avif', 'avif'),
+        ('image/webp', 'WEBP', 'webp', 'webp'),
+    )
+    if feature in features.modules and features.check(feature)
+)
+HASH_CHUNK_SIZE: int = 64 * 1024
+
+
+def content_hash(image_file) -> str:
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: image_file.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    image_file.seek(0)
+    return digest.hexdigest()
+
+
+def variant_name(image_hash: str, width: int, extension: str) -> str:
+    return f'posts/variants/{image_hash[:2]}/{image_hash}_{width}.{extension}'
+
+
+def _save_variant(image, name: str, pil_format: str, width: int,
+                  overwrite: bool = False) -> str:
+    """Сохраняет вариант, если такого файла ещё нет или он пересоздаётся."""
+    if default_storage.exists(name):
+        if not overwrite:
+            return name
+        default_storage.delete(name)
+    height = round(width * THUMBNAIL_SIZE[1] / THUMBNAIL_SIZE[0])
+    variant = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    buffer = BytesIO()
+    variant.save(buffer, pil_format, quality=THUMBNAIL_QUALITY)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def build_variants(image_file, image_hash: str,
+                   overwrite: bool = False) -> dict:
+    """Готовит миниатюру и варианты для `srcset` из файла картинки."""
+    image = Image.open(image_file).convert('RGB')
+    thumbnail = _save_variant(
+        image,
+        variant_name(image_hash, THUMBNAIL_SIZE[0], 'jpg'),
+        'JPEG',
+        THUMBNAIL_SIZE[0],
+        overwrite,
+    )
+    max_width = max(image.width, THUMBNAIL_SIZE[0])
+    widths = [width for width in VARIANT_WIDTHS if width <= max_width]
+    srcset = {
+        mime: ', '.join(
+            default_storage.url(_save_variant(
+                image,
+                variant_name(image_hash, width, extension),
+                pil_format,
+                width,
+                overwrite,
+            )) + f' {width}w'
+            for width in widths
+        )
+        for mime, pil_format, extension in VARIANT_FORMATS
+    }
+    return {
+        'thumbnail': thumbnail,
+        'image_hash': image_hash,
+        'image_srcset': json.dumps(srcset),
+    }
+
+
+def make_thumbnail(post_id: int, rebuilt: set = None) -> None:
+    """Готовит миниатюру и варианты картинки поста.
+
+    При пересборке передаётся `rebuilt` — хэши, варианты которых уже
+    пересозданы в этом проходе. Остальные картинки собираются заново
+    с перезаписью файлов, а не берутся у других постов.
+    """
+    post = Post.objects.filter(pk=post_id).only(
+        'image', 'author', 'group'
+    ).first()
+    if post is None or not post.image:
+        return
+    image_name = post.image.name
+    with default_storage.open(image_name) as image_file:
+        image_hash = content_hash(image_file)
+        fields = None
+        if rebuilt is None or image_hash in rebuilt:
+            fields = Post.objects.filter(
+                image_hash=image_hash
+            ).exclude(pk=post_id).exclude(thumbnail='').values(
+                'thumbnail', 'image_hash', 'image_srcset'
+            ).first()
+        if fields is None:
+            fields = build_variants(
+                image_file, image_hash, overwrite=rebuilt is not None
+            )
+            if rebuilt is not None:
+                rebuilt.add(image_hash)
+    # Картинку могли заменить, пока готовились варианты.
+    if Post.objects.filter(pk=post_id, image=image_name).update(
+        updated_at=timezone.now(), **fields
+    ):
+        bump_version(FEED_CACHE_NAMESPACE, *post_namespaces(post))
+
+
+def schedule_thumbnail(post) -> None:
+    """Ставит миниатюру поста в очередь фоновых задач."""
+    if post.image:
+        run_in_background(make_thumbnail, post.pk)
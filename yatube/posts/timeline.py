@@ -0,0 +1,204 @@
+"""Лента подписок, разложенная по читателям при публикации.
+
+Посты обычных авторов копируются в `TimelineEntry` каждого подписчика
+(fan-out on write). Посты авторов, у которых подписчиков больше
+`TIMELINE_FANOUT_MAX_FOLLOWERS`, не раскладываются, а подмешиваются
+при чтении ленты (fan-out on read).
+
+Способ доставки хранится в `AuthorStats.fanned_out`, и запись и чтение
+смотрят на него, а не на текущее число подписчиков. Раскладка
+возобновляется, только когда подписчиков становится не больше
+`TIMELINE_FANOUT_RESUME_FOLLOWERS`, чтобы автор на границе не
+переключался на каждой подписке. Само переключение выполняется в фоне:
+уже разложенные посты удаляются из лент после снятия флага, а посты
+раскладываются всем подписчикам до его установки. Так пост не пропадает
+из ленты ни в какой момент.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+from core.paginator import CursorPaginator, NEXT, keyset_filter
+from core.tasks import run_in_background
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+
+CHUNK_SIZE: int = 1000
+SWITCH_LOCK_KEY = 'timeline_switch:{}'
+SWITCH_LOCK_TIMEOUT: int = 60 * 10
+
+
+def should_fan_out(stats) -> bool:
+    """Каким должен быть способ доставки при текущем числе подписчиков."""
+    if stats.fanned_out:
+        limit = settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+    else:
+        limit = settings.TIMELINE_FANOUT_RESUME_FOLLOWERS
+    return stats.followers_count <= limit
+
+
+def fans_out(stats) -> bool:
+    """Раскладываются ли посты автора; на пороге планирует переключение."""
+    if should_fan_out(stats) != stats.fanned_out:
+        lock_key = SWITCH_LOCK_KEY.format(stats.pk)
+        if cache.add(lock_key, True, SWITCH_LOCK_TIMEOUT):
+            run_in_background(switch_delivery, stats.pk)
+    return stats.fanned_out
+
+
+def switch_delivery(author_id) -> None:
+    """Переключает способ доставки постов автора."""
+    try:
+        stats = AuthorStats.objects.filter(pk=author_id).first()
+        if stats is None or should_fan_out(stats) == stats.fanned_out:
+            return
+        if stats.fanned_out:
+            AuthorStats.objects.filter(pk=author_id).update(fanned_out=False)
+            TimelineEntry.objects.filter(author_id=author_id).delete()
+        else:
+            _resume_fan_out(author_id)
+    finally:
+        cache.delete(SWITCH_LOCK_KEY.format(author_id))
+
+
+def _resume_fan_out(author_id) -> None:
+    """Раскладывает все посты автора и только потом ставит флаг.
+
+    Подписки и посты, появившиеся до установки флага, сигналы
+    пропустили, поэтому после неё они раскладываются ещё раз.
+    """
+    follows = Follow.objects.filter(author_id=author_id)
+    posts = Post.objects.filter(author_id=author_id)
+    last_follow = follows.aggregate(last=Max('pk'))['last'] or 0
+    last_post = posts.aggregate(last=Max('pk'))['last'] or 0
+    _insert_posts(author_id, follows.filter(pk__lte=last_follow), posts)
+    AuthorStats.objects.filter(pk=author_id).update(fanned_out=True)
+    _insert_posts(author_id, follows.filter(pk__gt=last_follow), posts)
+    _insert_posts(author_id, follows, posts.filter(pk__gt=last_post))
+    TimelineEntry.objects.filter(author_id=author_id).exclude(
+        user_id__in=follows.values('user_id')
+    ).delete()
+
+
+def _insert_posts(author_id, follows, posts) -> None:
+    """Раскладывает посты автора по лентам подписчиков."""
+    posts = list(posts.values_list('pk', 'pub_date'))
+    _insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for user_id in follows.values_list('user_id', flat=True).iterator()
+        for post_id, pub_date in posts
+    )
+
+
+def _insert(entries) -> None:
+    """Записи лент частями: bulk_create превращает генератор в список."""
+    entries = iter(entries)
+    while True:
+        chunk = list(islice(entries, CHUNK_SIZE))
+        if not chunk:
+            return
+        TimelineEntry.objects.bulk_create(chunk, ignore_conflicts=True)
+
+
+def fan_out(post) -> None:
+    """Добавляет новый пост в ленты подписчиков автора."""
+    if not fans_out(AuthorStats.for_user(post.author)):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in follower_ids.iterator()
+    )
+
+
+def backfill(user, author) -> None:
+    """Добавляет в ленту пользователя посты нового автора."""
+    if not fans_out(AuthorStats.for_user(author)):
+        return
+    posts = Post.objects.filter(author=author).values_list('pk', 'pub_date')
+    _insert(
+        TimelineEntry(
+            user_id=user.pk,
+            post_id=post_id,
+            author_id=author.pk,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def prune(user, author) -> None:
+    """Убирает из ленты пользователя посты автора."""
+    TimelineEntry.objects.filter(user=user, author=author).delete()
+    stats = AuthorStats.objects.filter(user_id=author.pk).first()
+    if stats is not None:
+        fans_out(stats)
+
+
+class TimelinePaginator(CursorPaginator):
+    """Читает ленту подписок из `TimelineEntry`.
+
+    Посты популярных авторов читаются отдельным запросом на автора:
+    так каждый идёт по индексу (author, -pub_date, -id) без сортировки,
+    а ключи сливаются в Python. Номерные страницы собираются так же.
+    """
+
+    def __init__(self, *args, user, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+
+    @cached_property
+    def popular_author_ids(self) -> list:
+        return list(Follow.objects.filter(
+            user=self.user,
+            author__stats__fanned_out=False,
+        ).values_list('author_id', flat=True))
+
+    def keys(self, position, direction: str, limit: int) -> list:
+        """До `limit` ключей (pub_date, pk) ленты за позицией."""
+        keys = set(keyset_filter(
+            TimelineEntry.objects.filter(user=self.user),
+            position,
+            direction,
+            pk_field='post_id',
+        ).values_list('pub_date', 'post_id')[:limit])
+        for author_id in self.popular_author_ids:
+            keys.update(keyset_filter(
+                Post.objects.filter(author_id=author_id),
+                position,
+                direction,
+            ).values_list('pub_date', 'pk')[:limit])
+        return sorted(keys, reverse=direction == NEXT)[:limit]
+
+    def posts(self, keys) -> list:
+        posts = Post.objects.feed().select_related(
+            'author', 'group'
+        ).in_bulk([pk for _, pk in keys])
+        return [posts[pk] for _, pk in keys if pk in posts]
+
+    def fetch(self, position, direction: str, limit: int) -> list:
+        return self.posts(self.keys(position, direction, limit))
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        keys = self.keys(None, NEXT, top)[bottom:top]
+        return self._get_page(self.posts(keys), number, self)
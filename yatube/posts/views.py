@@ -1,73 +1,171 @@
+from functools import partial
+
 from django.shortcuts import render, get_object_or_404
-from django.core.paginator import Paginator
+from django.core.paginator import Page
 from django.shortcuts import redirect
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.template.response import TemplateResponse
 
-from .models import Post, Group, User, Comment, Follow
+from core.db_router import replica_reads
+from core.page_cache import (
+    conditional_page, depends_on, model_namespace, shared_page_cache,
+)
+from core.paginator import CursorPaginator, page_window
+from .counts import post_count, follow_post_count
+from .models import Post, Group, User, Follow, AuthorStats
+from .search import SearchPaginator, fts_enabled, search_filter
+from .thumbnails import schedule_thumbnail
+from .timeline import TimelinePaginator
 from .forms import PostForm, CommentForm
 
 
-def paginator_use(request, posts: Post, amount: int) -> Paginator:
-    """Function for easy-create paginator in view-functions."""
-    paginator = Paginator(posts, amount)
+def paginator_use(request, posts: Post, amount: int, count=None,
+                  paginator_class=CursorPaginator, **kwargs) -> Page:
+    """Function for easy-create paginator in view-functions.
+
+    Pages are addressed by an opaque `?cursor=` token; numbered
+    `?page=` links are still served for backward compatibility.
+    `count` is an optional callable returning the (cached) total.
+    Other GET parameters are kept in `page.query_prefix` for links,
+    `page.next_url` and `page.previous_url` point to the neighbours.
+    Numbered pages also get `page.page_window` for the navigation.
+    """
+    paginator = paginator_class(posts, amount, count=count, **kwargs)
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    if page_number is not None:
+        page = paginator.get_page(page_number)
+    else:
+        page = paginator.get_cursor_page(request.GET.get('cursor'))
+    params = request.GET.copy()
+    params.pop('page', None)
+    params.pop('cursor', None)
+    prefix = f'?{params.urlencode()}&' if params else '?'
+    page.query_prefix = prefix
+    page.next_url = page.previous_url = None
+    if page_number is None:
+        if page.next_cursor:
+            page.next_url = f'{prefix}cursor={page.next_cursor}'
+        if page.previous_cursor:
+            page.previous_url = f'{prefix}cursor={page.previous_cursor}'
+    else:
+        if page.has_next():
+            page.next_url = f'{prefix}page={page.next_page_number()}'
+        if page.has_previous():
+            page.previous_url = f'{prefix}page={page.previous_page_number()}'
+        page.page_window = page_window(
+            page.number,
+            paginator.num_pages,
+            settings.PAGINATOR_ON_EACH_SIDE,
+            settings.PAGINATOR_ON_ENDS,
+        )
+    return page
 
 
+def page_namespaces(posts) -> set:
+    """Пространства имён кэша страниц для авторов и групп постов."""
+    namespaces = set()
+    for post in posts:
+        namespaces.add(model_namespace(User, post.author_id))
+        if post.group_id is not None:
+            namespaces.add(model_namespace(Group, post.group_id))
+    return namespaces
+
+
+@shared_page_cache
+@conditional_page
+@replica_reads
 def index(request):
     template = 'posts/index.html'
-    posts = Post.objects.select_related(
+    posts = Post.objects.feed().select_related(
         'author',
-        'group',).all()
-    page_obj = paginator_use(request, posts, settings.AMOUNT_POSTS)
+        'group',)
+    page_obj = paginator_use(
+        request, posts, settings.AMOUNT_POSTS, count=post_count
+    )
+    depends_on(request, model_namespace(Post), *page_namespaces(page_obj))
     context = {
         'page_obj': page_obj,
         'index': True,
     }
-    return render(request, template, context)
+    return TemplateResponse(request, template, context)
 
 
+@shared_page_cache
+@conditional_page
+@replica_reads
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author').all()
-    page_obj = paginator_use(request, posts, settings.AMOUNT_POSTS)
+    posts = group.posts.feed().select_related('author')
+    page_obj = paginator_use(
+        request,
+        posts,
+        settings.AMOUNT_POSTS,
+        count=partial(post_count, group=group),
+    )
+    depends_on(
+        request,
+        model_namespace(Group, group.pk),
+        *page_namespaces(page_obj),
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
     }
-    return render(request, 'posts/group_list.html', context)
+    return TemplateResponse(request, 'posts/group_list.html', context)
 
 
+@shared_page_cache
+@conditional_page
+@replica_reads
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related('group').all()
-    page_obj = paginator_use(request, posts, settings.AMOUNT_POSTS)
-    following = (request.user.is_authenticated) and (
-        Follow.objects.filter(
-            user=request.user,
-            author=author,
-        ).exists()
+    posts = author.posts.feed().select_related('group')
+    page_obj = paginator_use(
+        request,
+        posts,
+        settings.AMOUNT_POSTS,
+        count=partial(post_count, author=author),
+    )
+    depends_on(
+        request,
+        model_namespace(User, author.pk),
+        *page_namespaces(page_obj),
     )
     context = {
         'author': author,
+        'stats': AuthorStats.for_user(author),
         'page_obj': page_obj,
-        'following': following,
     }
-    return render(request, 'posts/profile.html', context)
+    return TemplateResponse(request, 'posts/profile.html', context)
 
 
+@shared_page_cache
+@conditional_page
+@replica_reads
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = Comment.objects.filter(post=post_id)
-    form = CommentForm()
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'),
+        pk=post_id,
+    )
+    comments = paginator_use(
+        request,
+        post.comments.select_related('author'),
+        settings.AMOUNT_COMMENTS,
+    )
+    depends_on(
+        request,
+        model_namespace(Post, post.pk),
+        *page_namespaces([post]),
+        *(model_namespace(User, comment.author_id) for comment in comments),
+    )
     context = {
         'post': post,
+        'stats': AuthorStats.for_user(post.author),
         'comments': comments,
-        'form': form
+        'form': CommentForm(),
     }
-    return render(request, 'posts/post_detail.html', context)
+    return TemplateResponse(request, 'posts/post_detail.html', context)
 
 
 @login_required
@@ -77,6 +175,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        schedule_thumbnail(post)
         return redirect('posts:profile', request.user)
     context = {
         'form': form,
@@ -94,7 +193,13 @@ def post_edit(request, post_id):
     if request.user != post.author:
         return redirect('posts:profile', post.author)
     if form.is_valid():
+        image_changed = 'image' in form.changed_data
+        if image_changed:
+            post.thumbnail = ''
+            post.image_srcset = ''
         post.save()
+        if image_changed:
+            schedule_thumbnail(post)
         return redirect('posts:post_detail', post.pk)
     context = {
         'form': form,
@@ -117,12 +222,25 @@ def add_comment(request, post_id):
 
 
 @login_required
+@replica_reads
 def follow_index(request):
     template = 'posts/follow.html'
-    posts = Post.objects.select_related('author', 'group').filter(
+    posts = Post.objects.feed().select_related('author', 'group').filter(
         author__following__user=request.user
     )
-    page_obj = paginator_use(request, posts, settings.AMOUNT_POSTS)
+    timeline = {}
+    if settings.USE_FOLLOW_TIMELINE:
+        timeline = {
+            'paginator_class': TimelinePaginator,
+            'user': request.user,
+        }
+    page_obj = paginator_use(
+        request,
+        posts,
+        settings.AMOUNT_POSTS,
+        count=partial(follow_post_count, request.user),
+        **timeline,
+    )
     context = {
         'page_obj': page_obj,
         'follow': True,
@@ -149,3 +267,28 @@ def profile_unfollow(request, username):
         author=author
     ).delete()
     return redirect('posts:profile', username)
+
+
+@replica_reads
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        posts = Post.objects.feed().select_related('author', 'group')
+        if fts_enabled(posts.db):
+            page_obj = paginator_use(
+                request,
+                posts,
+                settings.AMOUNT_POSTS,
+                paginator_class=SearchPaginator,
+                query=query,
+            )
+        else:
+            page_obj = paginator_use(
+                request, search_filter(posts, query), settings.AMOUNT_POSTS
+            )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
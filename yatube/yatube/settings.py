@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'benchmarks.apps.BenchmarksConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -50,6 +51,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.CacheBatchMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,12 +67,27 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    # Скомпилированные шаблоны живут в памяти процесса до перезапуска.
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+# Компилировать шаблоны проекта при загрузке wsgi.py, до форка воркеров.
+WARM_TEMPLATES: bool = not DEBUG
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, который отдаёт время рендеринга
+        # в QueryBudgetMiddleware.
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -90,9 +109,23 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    # Реплика только для чтения; см. core.db_router.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# Алиасы из DATABASES, с которых читают view с `replica_reads`.
+DATABASE_REPLICAS: list = []
+# Сколько секунд после записи клиент читает с основной базы;
+# должно быть больше отставания реплик.
+REPLICA_PIN_SECONDS: int = 5
+REPLICA_PIN_COOKIE = 'primary_pin'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -143,15 +176,85 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 AMOUNT_POSTS: int = 10
+AMOUNT_COMMENTS: int = 20
+# Навигация по номерным страницам: соседей с каждой стороны
+# от текущей и страниц у каждого края.
+PAGINATOR_ON_EACH_SIDE: int = 2
+PAGINATOR_ON_ENDS: int = 1
 LENGHT_STR_METHOD: int = 15
+# Длина анонса поста и комментария в символах.
+EXCERPT_LENGTH: int = 300
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+FILE_UPLOAD_HANDLERS = ['core.uploads.CappedUploadHandler']
+UPLOAD_MAX_SIZE: int = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS: int = 40_000_000
+IMAGE_MAX_SIDE: int = 2048
+
+# L1 — LRU в каждом процессе с лимитом в байтах, L2 — общий для всех
+# воркеров файловый кэш; см. core.cache_backends.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.TieredCache',
+        'OPTIONS': {
+            'L2': {
+                'BACKEND': 'core.cache_backends.FileCache',
+                'LOCATION': os.path.join(BASE_DIR, 'cache'),
+                'TIMEOUT': None,
+                'OPTIONS': {'MAX_ENTRIES': 10000, 'CULL_INTERVAL': 10},
+            },
+            'L1_MAX_BYTES': 32 * 1024 * 1024,
+            'L1_COMPRESS_MIN_SIZE': 16 * 1024,
+            'L1_TIMEOUT': 60,
+            'SYNC_INTERVAL': 1,
+        },
     }
 }
+
+# Тесты получают L2 во временном каталоге.
+TEST_RUNNER = 'core.test_runner.TempCacheRunner'
+
+VERSIONED_CACHE_TIMEOUT: int = 60 * 60
+CACHE_LOCK_TIMEOUT: int = 10
+POST_COUNT_TIMEOUT: int = 60 * 5
+PAGE_CACHE_TIMEOUT: int = 60 * 10
+POST_CARD_TIMEOUT: int = 60 * 60 * 24
+
+BACKGROUND_WORKERS: int = 2
+
+USE_FOLLOW_TIMELINE: bool = True
+TIMELINE_FANOUT_MAX_FOLLOWERS: int = 1000
+# Ниже MAX, чтобы автор на пороге не переключал способ доставки.
+TIMELINE_FANOUT_RESUME_FOLLOWERS: int = 800
+
+QUERY_BUDGET_ENABLED: bool = False
+QUERY_BUDGET_LOG_FILE = os.path.join(BASE_DIR, 'query_budget.log')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {
+            'format': '%(message)s',
+        },
+    },
+    'handlers': {
+        'query_budget': {
+            'class': 'logging.FileHandler',
+            'filename': QUERY_BUDGET_LOG_FILE,
+            'formatter': 'message',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'core.query_budget': {
+            'handlers': ['query_budget'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if settings.WARM_TEMPLATES:
+    # С `gunicorn --preload` модуль импортирует мастер-процесс, и
+    # скомпилированные шаблоны достаются воркерам при форке.
+    from core.template_warmup import warm_templates
+    warm_templates()